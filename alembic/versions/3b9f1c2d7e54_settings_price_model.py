@@ -0,0 +1,34 @@
+"""settings price model
+
+Revision ID: 3b9f1c2d7e54
+Revises: 8ecd8aa046fd
+Create Date: 2026-10-18 15:41:09.274613
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9f1c2d7e54'
+down_revision: Union[str, None] = '8ecd8aa046fd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'game_settings',
+        sa.Column(
+            'price_model',
+            sa.String(),
+            nullable=False,
+            server_default='uniform',
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('game_settings', 'price_model')
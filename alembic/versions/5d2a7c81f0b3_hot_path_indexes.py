@@ -0,0 +1,70 @@
+"""hot path indexes
+
+Revision ID: 5d2a7c81f0b3
+Revises: 3b9f1c2d7e54
+Create Date: 2026-10-18 17:22:48.603117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2a7c81f0b3'
+down_revision: Union[str, None] = '3b9f1c2d7e54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Only the newest active game of a chat stays active
+    op.execute(
+        'UPDATE games SET is_active = false, '
+        'finish_at = coalesce(finish_at, now()) '
+        'WHERE is_active AND id NOT IN '
+        '(SELECT max(id) FROM games WHERE is_active GROUP BY chat_id)'
+    )
+    op.create_index(
+        'ix_games_chat_id_active',
+        'games',
+        ['chat_id'],
+        unique=True,
+        postgresql_where=sa.text('is_active'),
+    )
+    op.execute(
+        'DELETE FROM players WHERE id NOT IN '
+        '(SELECT min(id) FROM players GROUP BY game_id, user_id)'
+    )
+    op.create_unique_constraint(
+        'uq_players_game_id_user_id', 'players', ['game_id', 'user_id']
+    )
+    op.create_index(
+        'ix_players_game_id_alive',
+        'players',
+        ['game_id'],
+        postgresql_where=sa.text('alive'),
+    )
+    op.execute(
+        'DELETE FROM game_inventory WHERE id NOT IN '
+        '(SELECT min(id) FROM game_inventory GROUP BY game_id, share_id)'
+    )
+    op.create_unique_constraint(
+        'uq_game_inventory_game_id_share_id',
+        'game_inventory',
+        ['game_id', 'share_id'],
+    )
+    op.create_index('ix_polls_game_id', 'polls', ['game_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_polls_game_id', table_name='polls')
+    op.drop_constraint(
+        'uq_game_inventory_game_id_share_id', 'game_inventory', type_='unique'
+    )
+    op.drop_index('ix_players_game_id_alive', table_name='players')
+    op.drop_constraint(
+        'uq_players_game_id_user_id', 'players', type_='unique'
+    )
+    op.drop_index('ix_games_chat_id_active', table_name='games')
@@ -0,0 +1,57 @@
+"""game results
+
+Revision ID: 7c4e2a9b1d60
+Revises: 5d2a7c81f0b3
+Create Date: 2026-10-18 19:05:12.418226
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c4e2a9b1d60'
+down_revision: Union[str, None] = '5d2a7c81f0b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('game_results',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('game_id', sa.BigInteger(), nullable=False),
+    sa.Column('chat_id', sa.BigInteger(), nullable=False),
+    sa.Column('player_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('total_value', sa.BigInteger(), nullable=False),
+    sa.Column('is_winner', sa.Boolean(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['game_id'], ['games.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['player_id'], ['players.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint(
+        'game_id', 'player_id', name='uq_game_results_game_id_player_id'
+    )
+    )
+    op.create_index(
+        'ix_game_results_total_value',
+        'game_results',
+        [sa.text('total_value DESC')],
+    )
+    op.create_index(
+        'ix_game_results_chat_id_total_value',
+        'game_results',
+        ['chat_id', sa.text('total_value DESC')],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_game_results_chat_id_total_value', table_name='game_results'
+    )
+    op.drop_index('ix_game_results_total_value', table_name='game_results')
+    op.drop_table('game_results')
@@ -0,0 +1,90 @@
+"""player inventory quantity
+
+Revision ID: 8ecd8aa046fd
+Revises: 6e01d341aecd
+Create Date: 2026-10-18 12:04:31.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8ecd8aa046fd'
+down_revision: Union[str, None] = '6e01d341aecd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'player_inventory',
+        sa.Column('quantity', sa.Integer(), nullable=False, server_default='1'),
+    )
+    # Fold one-row-per-unit holdings into a single row per (owner, share)
+    op.execute(
+        'UPDATE player_inventory SET quantity = folded.quantity '
+        'FROM (SELECT min(id) AS id, count(*) AS quantity '
+        'FROM player_inventory GROUP BY share_owner, share_id) AS folded '
+        'WHERE player_inventory.id = folded.id'
+    )
+    op.execute(
+        'DELETE FROM player_inventory WHERE id NOT IN '
+        '(SELECT min(id) FROM player_inventory GROUP BY share_owner, share_id)'
+    )
+    op.alter_column('player_inventory', 'quantity', server_default=None)
+    op.create_check_constraint(
+        'ck_player_inventory_quantity', 'player_inventory', 'quantity >= 0'
+    )
+    op.create_unique_constraint(
+        'uq_player_inventory_share_owner_share_id',
+        'player_inventory',
+        ['share_owner', 'share_id'],
+    )
+    # share_id always stored shares.id, not game_inventory.id
+    op.drop_constraint(
+        'player_inventory_share_id_fkey', 'player_inventory', type_='foreignkey'
+    )
+    op.execute(
+        'DELETE FROM player_inventory '
+        'WHERE share_id NOT IN (SELECT id FROM shares)'
+    )
+    op.create_foreign_key(
+        'player_inventory_share_id_fkey',
+        'player_inventory',
+        'shares',
+        ['share_id'],
+        ['id'],
+        ondelete='CASCADE',
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        'player_inventory_share_id_fkey', 'player_inventory', type_='foreignkey'
+    )
+    op.create_foreign_key(
+        'player_inventory_share_id_fkey',
+        'player_inventory',
+        'game_inventory',
+        ['share_id'],
+        ['id'],
+        ondelete='CASCADE',
+    )
+    op.drop_constraint(
+        'uq_player_inventory_share_owner_share_id',
+        'player_inventory',
+        type_='unique',
+    )
+    op.drop_constraint(
+        'ck_player_inventory_quantity', 'player_inventory', type_='check'
+    )
+    op.execute('DELETE FROM player_inventory WHERE quantity = 0')
+    op.execute(
+        'INSERT INTO player_inventory (share_id, share_owner, quantity) '
+        'SELECT share_id, share_owner, 1 FROM player_inventory, '
+        'generate_series(2, player_inventory.quantity)'
+    )
+    op.drop_column('player_inventory', 'quantity')
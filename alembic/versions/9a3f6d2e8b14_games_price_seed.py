@@ -0,0 +1,31 @@
+"""games price seed
+
+Revision ID: 9a3f6d2e8b14
+Revises: 7c4e2a9b1d60
+Create Date: 2026-10-18 21:14:37.902251
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3f6d2e8b14'
+down_revision: Union[str, None] = '7c4e2a9b1d60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('games', sa.Column('price_seed', sa.String(), nullable=True))
+    op.execute(
+        "UPDATE games SET price_seed = "
+        "replace(gen_random_uuid()::text, '-', '')"
+    )
+    op.alter_column('games', 'price_seed', nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column('games', 'price_seed')
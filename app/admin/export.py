@@ -0,0 +1,36 @@
+import csv
+import datetime
+import io
+from collections.abc import Sequence
+
+from app.web.utils import dumps
+
+EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _plain(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_ndjson(rows: Sequence, header: bool = False) -> bytes:
+    return b"".join(dumps(dict(row._mapping)) + b"\n" for row in rows)
+
+
+def encode_csv(rows: Sequence, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header and rows:
+        writer.writerow(rows[0]._fields)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+EXPORT_ENCODERS = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+}
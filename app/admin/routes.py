@@ -5,12 +5,16 @@ if typing.TYPE_CHECKING:
 
 from app.admin.views import (
     AdminLoginView,
+    ChatLeaderboardView,
     GameDetailView,
+    GameExportView,
     GameListView,
     LastChatGameView,
+    LeaderboardView,
     ListSettingsView,
     ListShareView,
     MaximumSharePriceView,
+    MetricsView,
     MinimalSharePriceView,
     PlayerBalanceView,
     ShareView,
@@ -27,7 +31,10 @@ def setup_routes(app: "Application"):
     app.router.add_view("/admin/user/user_detail", UserDetailView)
     app.router.add_view("/admin/game/games_list", GameListView)
     app.router.add_view("/admin/game/game_detail", GameDetailView)
+    app.router.add_view("/admin/game/export", GameExportView)
     app.router.add_view("/admin/game/chat_last_game", LastChatGameView)
+    app.router.add_view("/admin/game/leaderboard", LeaderboardView)
+    app.router.add_view("/admin/game/chat_leaderboard", ChatLeaderboardView)
     app.router.add_view("/admin/settings/share", ShareView)
     app.router.add_view("/admin/settings/shares_list", ListShareView)
     app.router.add_view("/admin/settings", ListSettingsView)
@@ -40,3 +47,4 @@ def setup_routes(app: "Application"):
     app.router.add_view(
         "/admin/settings/maximum_share_price", MaximumSharePriceView
     )
+    app.router.add_view("/admin/metrics", MetricsView)
@@ -1,4 +1,14 @@
-from marshmallow import Schema, fields
+from marshmallow import (
+    Schema,
+    ValidationError,
+    fields,
+    validate,
+    validates_schema,
+)
+
+from app.admin.export import EXPORT_CONTENT_TYPES
+from app.game.price_engine import PRICE_MODELS
+from app.web.utils import compile_dump
 
 
 class AdminSchema(Schema):
@@ -19,12 +29,24 @@ class UserSchema(Schema):
     password = fields.String(required=True)
 
 
+class PageQuerySchema(Schema):
+    limit = fields.Integer(
+        required=False, load_default=50, validate=validate.Range(min=1, max=500)
+    )
+    after = fields.Integer(required=False)
+
+
+class UserListQuerySchema(PageQuerySchema):
+    is_admin = fields.Boolean(required=False)
+
+
 class UserIdSchema(Schema):
     id = fields.Integer(required=True)
 
 
 class UserListSchema(Schema):
     users = fields.Nested(UserSchema, many=True)
+    next_after = fields.Integer(allow_none=True)
 
 
 class GameSchema(Schema):
@@ -43,8 +65,52 @@ class GameChatIdSchema(Schema):
     chat_id = fields.Integer(required=True)
 
 
+class GameListQuerySchema(PageQuerySchema):
+    chat_id = fields.Integer(required=False)
+    finished_from = fields.NaiveDateTime(required=False)
+    finished_to = fields.NaiveDateTime(required=False)
+
+
+class GameExportQuerySchema(Schema):
+    format = fields.String(
+        required=False,
+        load_default="ndjson",
+        validate=validate.OneOf(list(EXPORT_CONTENT_TYPES)),
+    )
+    chat_id = fields.Integer(required=False)
+    finished_from = fields.NaiveDateTime(required=False)
+    finished_to = fields.NaiveDateTime(required=False)
+
+
 class GameListSchema(Schema):
     games = fields.Nested(GameSchema, many=True)
+    next_after = fields.Integer(allow_none=True)
+
+
+class LeaderboardQuerySchema(Schema):
+    limit = fields.Integer(
+        required=False, load_default=10, validate=validate.Range(min=1, max=100)
+    )
+
+
+class ChatLeaderboardQuerySchema(LeaderboardQuerySchema):
+    chat_id = fields.Integer(required=True)
+
+
+class GameResultSchema(Schema):
+    game_id = fields.Integer(required=True)
+    chat_id = fields.Integer(required=True)
+    user_id = fields.Integer(required=True)
+    first_name = fields.String(required=True)
+    nickname = fields.String(required=True)
+    rank = fields.Integer(required=True)
+    total_value = fields.Integer(required=True)
+    is_winner = fields.Boolean(required=True)
+    finished_at = fields.DateTime(required=True)
+
+
+class LeaderboardSchema(Schema):
+    results = fields.Nested(GameResultSchema, many=True)
 
 
 class ShareSchema(Schema):
@@ -87,3 +153,31 @@ class ListSettingsSchema(Schema):
     player_balance = fields.Integer(required=True)
     minimal_share_price = fields.Integer(required=True)
     maximum_share_price = fields.Integer(required=True)
+    price_model = fields.String(required=True)
+
+
+class UpdateSettingsSchema(Schema):
+    turn_timer = fields.Integer(required=False)
+    turn_counter = fields.Integer(required=False)
+    player_balance = fields.Integer(required=False)
+    minimal_share_price = fields.Integer(required=False)
+    maximum_share_price = fields.Integer(required=False)
+    price_model = fields.String(
+        required=False, validate=validate.OneOf(list(PRICE_MODELS))
+    )
+
+    @validates_schema
+    def validate_share_prices(self, data, **kwargs):
+        minimal = data.get("minimal_share_price")
+        maximum = data.get("maximum_share_price")
+        if minimal is not None and maximum is not None and minimal > maximum:
+            raise ValidationError(
+                "minimal_share_price must not exceed maximum_share_price",
+                "minimal_share_price",
+            )
+
+
+# Precompiled dumps for the schemas behind the large list responses
+dump_users = compile_dump(UserSchema())
+dump_games = compile_dump(GameSchema())
+dump_game_results = compile_dump(GameResultSchema())
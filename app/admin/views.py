@@ -1,3 +1,6 @@
+from contextlib import aclosing
+
+from aiohttp.web import StreamResponse
 from aiohttp.web_exceptions import HTTPBadRequest, HTTPConflict, HTTPForbidden
 from aiohttp_apispec import (
     docs,
@@ -7,13 +10,19 @@ from aiohttp_apispec import (
 )
 from aiohttp_session import new_session
 
+from app.admin.export import EXPORT_CONTENT_TYPES, EXPORT_ENCODERS
 from app.admin.schemes import (
     AdminResponseSchema,
     AdminSchema,
+    ChatLeaderboardQuerySchema,
     GameChatIdSchema,
+    GameExportQuerySchema,
     GameIdSchema,
+    GameListQuerySchema,
     GameListSchema,
     GameSchema,
+    LeaderboardQuerySchema,
+    LeaderboardSchema,
     ListSettingsSchema,
     ListShareSchema,
     MaximumSharePriceSchema,
@@ -23,12 +32,19 @@ from app.admin.schemes import (
     ShareSchema,
     TurnCounterSchema,
     TurnTimerSchema,
+    UpdateSettingsSchema,
     UserIdSchema,
+    UserListQuerySchema,
     UserListSchema,
     UserSchema,
+    dump_game_results,
+    dump_games,
+    dump_users,
 )
 from app.web.mixins import AuthRequiredMixin, View
-from app.web.utils import json_response
+from app.web.utils import json_response, next_after
+
+ACTIVE_GAME_MESSAGE = "Не возможно изменить настройки. Есть активная игра"
 
 
 class AdminLoginView(View):
@@ -73,10 +89,17 @@ class UserListView(AuthRequiredMixin, View):
         summary="List of all users",
         description="List of all users who registered at bot",
     )
+    @querystring_schema(UserListQuerySchema)
     @response_schema(UserListSchema)
     async def get(self):
-        users = await self.store.user.get_users_list()
-        return json_response(UserListSchema().dump({"users": users}))
+        query = self.request["querystring"]
+        users = await self.store.user.get_users_list(**query)
+        return json_response(
+            {
+                "users": dump_users(users),
+                "next_after": next_after(users, limit=query["limit"]),
+            }
+        )
 
 
 class UserDetailView(AuthRequiredMixin, View):
@@ -99,10 +122,50 @@ class GameListView(AuthRequiredMixin, View):
         summary="List of all games",
         description="List of all games that were played at bot",
     )
+    @querystring_schema(GameListQuerySchema)
     @response_schema(GameListSchema)
     async def get(self):
-        games = await self.store.games.get_all_finished_games()
-        return json_response(GameListSchema().dump({"games": games}))
+        query = self.request["querystring"]
+        games = await self.store.games.get_all_finished_games(**query)
+        return json_response(
+            {
+                "games": dump_games(games),
+                "next_after": next_after(games, limit=query["limit"]),
+            }
+        )
+
+
+class GameExportView(AuthRequiredMixin, View):
+    @docs(
+        tags=["games"],
+        summary="Export game history",
+        description="Stream every player of the finished games "
+        "as NDJSON or CSV",
+    )
+    @querystring_schema(GameExportQuerySchema)
+    async def get(self):
+        query = dict(self.request["querystring"])
+        export_format = query.pop("format")
+        encode = EXPORT_ENCODERS[export_format]
+        response = StreamResponse(
+            headers={
+                "Content-Type": EXPORT_CONTENT_TYPES[export_format],
+                "Content-Disposition": "attachment; "
+                f'filename="games.{export_format}"',
+            }
+        )
+        response.enable_chunked_encoding()
+        await response.prepare(self.request)
+        header = True
+        # A client that hangs up must not leave the cursor checked out
+        async with aclosing(
+            self.store.games.stream_game_history(**query)
+        ) as batches:
+            async for rows in batches:
+                await response.write(encode(rows, header=header))
+                header = False
+        await response.write_eof()
+        return response
 
 
 class GameDetailView(AuthRequiredMixin, View):
@@ -140,6 +203,36 @@ class LastChatGameView(AuthRequiredMixin, View):
         return json_response(GameSchema().dump(game))
 
 
+class LeaderboardView(AuthRequiredMixin, View):
+    @docs(
+        tags=["games"],
+        summary="Global leaderboard",
+        description="Best final results over all finished games",
+    )
+    @querystring_schema(LeaderboardQuerySchema)
+    @response_schema(LeaderboardSchema)
+    async def get(self):
+        query = self.request["querystring"]
+        results = await self.store.games.get_leaderboard(limit=query["limit"])
+        return json_response({"results": dump_game_results(results)})
+
+
+class ChatLeaderboardView(AuthRequiredMixin, View):
+    @docs(
+        tags=["games"],
+        summary="Chat leaderboard",
+        description="Best final results over the finished games of a chat",
+    )
+    @querystring_schema(ChatLeaderboardQuerySchema)
+    @response_schema(LeaderboardSchema)
+    async def get(self):
+        query = self.request["querystring"]
+        results = await self.store.games.get_leaderboard(
+            limit=query["limit"], chat_id=query["chat_id"]
+        )
+        return json_response({"results": dump_game_results(results)})
+
+
 class ShareView(AuthRequiredMixin, View):
     @docs(
         tags=["settings"],
@@ -206,11 +299,7 @@ class TurnTimerView(AuthRequiredMixin, View):
 
         games = await self.store.games.get_all_active_games()
         if games:
-            return json_response(
-                {
-                    "message": "Не возможно изменить настройки. Есть активная игра"
-                }
-            )
+            return json_response({"message": ACTIVE_GAME_MESSAGE})
         await self.store.settings.update_turn_timer(turn_timer)
         return json_response(TurnTimerSchema().dump({"turn_timer": turn_timer}))
 
@@ -231,11 +320,7 @@ class TurnCounterView(AuthRequiredMixin, View):
 
         games = await self.store.games.get_all_active_games()
         if games:
-            return json_response(
-                {
-                    "message": "Не возможно изменить настройки. Есть активная игра"
-                }
-            )
+            return json_response({"message": ACTIVE_GAME_MESSAGE})
         await self.store.settings.update_turn_counter(turn_counter)
         return json_response(
             TurnCounterSchema().dump({"turn_counter": turn_counter})
@@ -258,11 +343,7 @@ class PlayerBalanceView(AuthRequiredMixin, View):
 
         games = await self.store.games.get_all_active_games()
         if games:
-            return json_response(
-                {
-                    "message": "Не возможно изменить настройки. Есть активная игра"
-                }
-            )
+            return json_response({"message": ACTIVE_GAME_MESSAGE})
         await self.store.settings.update_player_balance(player_balance)
         return json_response(
             PlayerBalanceSchema().dump({"player_balance": player_balance})
@@ -285,11 +366,7 @@ class MinimalSharePriceView(AuthRequiredMixin, View):
 
         games = await self.store.games.get_all_active_games()
         if games:
-            return json_response(
-                {
-                    "message": "Не возможно изменить настройки. Есть активная игра"
-                }
-            )
+            return json_response({"message": ACTIVE_GAME_MESSAGE})
         await self.store.settings.update_shares_minimal_price(
             minimal_share_price
         )
@@ -316,11 +393,7 @@ class MaximumSharePriceView(AuthRequiredMixin, View):
 
         games = await self.store.games.get_all_active_games()
         if games:
-            return json_response(
-                {
-                    "message": "Не возможно изменить настройки. Есть активная игра"
-                }
-            )
+            return json_response({"message": ACTIVE_GAME_MESSAGE})
         await self.store.settings.update_shares_maximum_price(
             maximum_share_price
         )
@@ -339,20 +412,75 @@ class ListSettingsView(AuthRequiredMixin, View):
     )
     @response_schema(ListSettingsSchema)
     async def get(self):
-        turn_timer = await self.store.settings.get_turn_timer()
-        turn_counter = await self.store.settings.get_turn_counter()
-        player_balance = await self.store.settings.get_player_balance()
-        minimal_share_price = (
-            await self.store.settings.get_shares_minimal_price()
-        )
-        maximum_share_price = (
-            await self.store.settings.get_shares_maximum_price()
+        settings = self.store.settings.snapshot
+        response = {
+            "turn_timer": settings.turn_timer,
+            "turn_counter": settings.turn_counter,
+            "player_balance": settings.player_balance,
+            "minimal_share_price": settings.shares_minimal_price,
+            "maximum_share_price": settings.shares_maximum_price,
+            "price_model": settings.price_model,
+        }
+        return json_response(ListSettingsSchema().dump(response))
+
+    @docs(
+        tags=["settings"],
+        summary="Update several game settings",
+        description="Update several game settings at once "
+        "if there are no active games",
+    )
+    @request_schema(UpdateSettingsSchema)
+    @response_schema(ListSettingsSchema)
+    async def post(self):
+        data = self.request.get("data")
+        if not data:
+            raise HTTPBadRequest
+
+        games = await self.store.games.get_all_active_games()
+        if games:
+            return json_response({"message": ACTIVE_GAME_MESSAGE})
+        # The schema checks a pair, one bound is checked against the other
+        current = self.store.settings.snapshot
+        minimal = data.get("minimal_share_price", current.shares_minimal_price)
+        maximum = data.get("maximum_share_price", current.shares_maximum_price)
+        if minimal > maximum:
+            raise HTTPBadRequest
+        values = {
+            "turn_timer": data.get("turn_timer"),
+            "turn_counter": data.get("turn_counter"),
+            "player_balance": data.get("player_balance"),
+            "shares_minimal_price": data.get("minimal_share_price"),
+            "shares_maximum_price": data.get("maximum_share_price"),
+            "price_model": data.get("price_model"),
+        }
+        settings = await self.store.settings.update_many(
+            **{key: value for key, value in values.items() if value is not None}
         )
         response = {
-            "turn_timer": turn_timer,
-            "turn_counter": turn_counter,
-            "player_balance": player_balance,
-            "minimal_share_price": minimal_share_price,
-            "maximum_share_price": maximum_share_price,
+            "turn_timer": settings.turn_timer,
+            "turn_counter": settings.turn_counter,
+            "player_balance": settings.player_balance,
+            "minimal_share_price": settings.shares_minimal_price,
+            "maximum_share_price": settings.shares_maximum_price,
+            "price_model": settings.price_model,
         }
         return json_response(ListSettingsSchema().dump(response))
+
+
+class MetricsView(AuthRequiredMixin, View):
+    @docs(
+        tags=["metrics"],
+        summary="Bot metrics",
+        description="Queue depths and counters of the bot internals",
+    )
+    async def get(self):
+        return json_response(
+            {
+                "database": self.database.stats(),
+                "user_cache": self.store.user.cache.stats(),
+                "dispatcher": self.store.telegram_api.dispatcher.stats(),
+                "sender": self.store.telegram_api.sender.stats(),
+                "edits": self.store.telegram_api.edits.stats(),
+                "turns": self.store.telegram_api.bot.turns.stats(),
+            }
+        )
@@ -1,29 +1,151 @@
 import datetime
-
-from sqlalchemy import and_, delete, func, select, update
+import typing
+from collections.abc import AsyncIterator
+
+from sqlalchemy import (
+    Integer,
+    and_,
+    column,
+    delete,
+    func,
+    literal,
+    select,
+    true,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
 
 from app.base.base_accessor import BaseAccessor
 from app.game.models import (
     GameInventoryModel,
     GameModel,
+    GameResultModel,
     PlayerInventoryModel,
     PlayerModel,
     ShareModel,
 )
+from app.game.price_engine import get_price_model, new_price_seed
+from app.game.state import (
+    GameState,
+    PlayerStanding,
+    PlayerState,
+    ShareState,
+)
+from app.telegram.models import PollModel
+from app.users.models import UserModel
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+EXPORT_BATCH_SIZE = 1000
 
 
 class GameAccessor(BaseAccessor):
-    async def create_game(self, chat_id: int) -> GameModel:
-        datetime_now = datetime.datetime.now()
+    def __init__(self, app: "Application", *args, **kwargs) -> None:
+        super().__init__(app, *args, **kwargs)
+        # Share catalog by id and by name, loaded lazily and dropped on
+        # every share change
+        self._shares: dict[int, ShareModel] | None = None
+        self._shares_by_name: dict[str, ShareModel] | None = None
+        # Bumped on every invalidation, a load started before it is stale
+        self._shares_generation = 0
+
+    async def _get_share_catalog(
+        self,
+    ) -> tuple[dict[int, ShareModel], dict[str, ShareModel]]:
+        if self._shares is not None and self._shares_by_name is not None:
+            return self._shares, self._shares_by_name
+        generation = self._shares_generation
         async with self.app.database.session() as session:
-            game = GameModel(
+            shares = await session.scalars(
+                select(ShareModel).order_by(ShareModel.id)
+            )
+            by_id = {share.id: share for share in shares}
+        by_name = {share.name: share for share in by_id.values()}
+        if generation == self._shares_generation:
+            self._shares, self._shares_by_name = by_id, by_name
+        return by_id, by_name
+
+    def _invalidate_share_catalog(self) -> None:
+        def invalidate() -> None:
+            self._shares_generation += 1
+            self._shares = self._shares_by_name = None
+
+        invalidate()
+        # A reload racing the change must not outlive its commit
+        self.app.database.on_commit(invalidate)
+
+    async def create_game_with_inventory(
+        self, chat_id: int, poll_id: str | None = None
+    ) -> GameState:
+        # Game, its inventory and the poll go in as one statement
+        price_seed = new_price_seed()
+        game_cte = (
+            insert(GameModel)
+            .values(
                 chat_id=chat_id,
-                started_at=datetime_now,
+                started_at=datetime.datetime.now(),
                 finish_at=None,
+                is_active=True,
+                last_turn=1,
+                price_seed=price_seed,
+            )
+            .returning(GameModel.id)
+            .cte("new_game")
+        )
+        inventory_cte = (
+            insert(GameInventoryModel)
+            .from_select(
+                ["share_id", "game_id", "price"],
+                select(ShareModel.id, game_cte.c.id, ShareModel.start_price)
+                .join(game_cte, true())
+                .order_by(ShareModel.id),
             )
-            session.add(game)
+            .returning(
+                GameInventoryModel.id,
+                GameInventoryModel.share_id,
+                GameInventoryModel.price,
+            )
+            .cte("new_inventory")
+        )
+        stmt = (
+            select(
+                game_cte.c.id.label("game_id"),
+                inventory_cte.c.share_id,
+                ShareModel.name,
+                inventory_cte.c.price,
+            )
+            .select_from(game_cte)
+            .outerjoin(inventory_cte, true())
+            .outerjoin(ShareModel, ShareModel.id == inventory_cte.c.share_id)
+            .order_by(inventory_cte.c.id)
+        )
+        if poll_id is not None:
+            stmt = stmt.add_cte(
+                insert(PollModel)
+                .from_select(
+                    ["poll_id", "game_id"],
+                    select(literal(poll_id), game_cte.c.id),
+                )
+                .cte("new_poll")
+            )
+        async with self.app.database.session() as session:
+            rows = (await session.execute(stmt)).all()
             await session.commit()
-        return game
+
+        state = GameState(
+            game_id=rows[0].game_id,
+            chat_id=chat_id,
+            turn=1,
+            price_seed=price_seed,
+        )
+        for row in rows:
+            if row.share_id is not None:
+                state.shares[row.share_id] = ShareState(
+                    share_id=row.share_id, name=row.name, price=row.price
+                )
+        return state
 
     async def get_all_active_games(self) -> list[GameModel]:
         stmt = select(GameModel).where(GameModel.is_active == True)
@@ -52,7 +174,9 @@ class GameAccessor(BaseAccessor):
             await session.execute(stmt)
             await session.commit()
 
-    async def finish_game(self, game_id: int) -> None:
+    async def finish_game(
+        self, game_id: int, save_results: bool = False
+    ) -> None:
         datetime_now = datetime.datetime.now()
         stmt = (
             update(GameModel)
@@ -61,17 +185,154 @@ class GameAccessor(BaseAccessor):
         )
         async with self.app.database.session() as session:
             await session.execute(stmt)
+            if save_results:
+                await session.execute(
+                    self._save_results_stmt(game_id, datetime_now)
+                )
             await session.commit()
 
-    async def get_all_finished_games(self) -> list[GameModel]:
+    @classmethod
+    def _save_results_stmt(cls, game_id: int, finished_at: datetime.datetime):
+        standings = cls._standings_query(game_id).subquery("standings")
+        chat_id = (
+            select(GameModel.chat_id)
+            .where(GameModel.id == game_id)
+            .scalar_subquery()
+        )
+        return (
+            insert(GameResultModel)
+            .from_select(
+                [
+                    "game_id",
+                    "chat_id",
+                    "player_id",
+                    "user_id",
+                    "rank",
+                    "total_value",
+                    "is_winner",
+                    "finished_at",
+                ],
+                select(
+                    literal(game_id),
+                    chat_id,
+                    standings.c.player_id,
+                    standings.c.user_id,
+                    standings.c.rank,
+                    standings.c.total_value,
+                    standings.c.rank == 1,
+                    literal(finished_at),
+                ),
+            )
+            .on_conflict_do_nothing(
+                constraint="uq_game_results_game_id_player_id"
+            )
+        )
+
+    async def get_leaderboard(
+        self, limit: int, chat_id: int | None = None
+    ) -> list:
+        stmt = (
+            select(
+                GameResultModel.game_id,
+                GameResultModel.chat_id,
+                GameResultModel.user_id,
+                UserModel.first_name,
+                UserModel.nickname,
+                GameResultModel.rank,
+                GameResultModel.total_value,
+                GameResultModel.is_winner,
+                GameResultModel.finished_at,
+            )
+            .join(UserModel, UserModel.id == GameResultModel.user_id)
+            .order_by(GameResultModel.total_value.desc(), GameResultModel.id)
+            .limit(limit)
+        )
+        if chat_id is not None:
+            stmt = stmt.where(GameResultModel.chat_id == chat_id)
+        async with self.app.database.session() as session:
+            return list(await session.execute(stmt))
+
+    async def get_all_finished_games(
+        self,
+        limit: int,
+        after: int | None = None,
+        chat_id: int | None = None,
+        finished_from: datetime.datetime | None = None,
+        finished_to: datetime.datetime | None = None,
+    ) -> list[GameModel]:
         stmt = (
             select(GameModel)
-            .where(GameModel.is_active == False)
+            .where(
+                *self._finished_games_filter(
+                    chat_id, finished_from, finished_to
+                )
+            )
             .order_by(GameModel.id)
+            .limit(limit)
         )
+        if after is not None:
+            stmt = stmt.where(GameModel.id > after)
         async with self.app.database.session() as session:
             return list(await session.scalars(stmt))
 
+    @staticmethod
+    def _finished_games_filter(
+        chat_id: int | None,
+        finished_from: datetime.datetime | None,
+        finished_to: datetime.datetime | None,
+    ) -> list:
+        clauses = [GameModel.is_active == False]
+        if chat_id is not None:
+            clauses.append(GameModel.chat_id == chat_id)
+        if finished_from is not None:
+            clauses.append(GameModel.finish_at >= finished_from)
+        if finished_to is not None:
+            clauses.append(GameModel.finish_at < finished_to)
+        return clauses
+
+    async def stream_game_history(
+        self,
+        chat_id: int | None = None,
+        finished_from: datetime.datetime | None = None,
+        finished_to: datetime.datetime | None = None,
+    ) -> AsyncIterator[list]:
+        stmt = (
+            select(
+                GameModel.id.label("game_id"),
+                GameModel.chat_id,
+                GameModel.started_at,
+                GameModel.finish_at,
+                GameModel.last_turn,
+                PlayerModel.id.label("player_id"),
+                UserModel.id.label("user_id"),
+                UserModel.telegram_id,
+                UserModel.first_name,
+                UserModel.nickname,
+                PlayerModel.balance,
+                PlayerModel.alive,
+                GameResultModel.rank,
+                GameResultModel.total_value,
+                GameResultModel.is_winner,
+            )
+            .join(PlayerModel, PlayerModel.game_id == GameModel.id)
+            .join(UserModel, UserModel.id == PlayerModel.user_id)
+            .outerjoin(
+                GameResultModel, GameResultModel.player_id == PlayerModel.id
+            )
+            .where(
+                *self._finished_games_filter(
+                    chat_id, finished_from, finished_to
+                )
+            )
+            .order_by(GameModel.id, PlayerModel.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        # Server-side cursor: only one batch of rows is held at a time
+        async with self.app.database.session(join=False) as session:
+            result = await session.stream(stmt)
+            async for rows in result.partitions():
+                yield rows
+
     async def get_last_chat_game(self, chat_id: int) -> GameModel:
         stmt = (
             select(GameModel)
@@ -115,41 +376,6 @@ class GameAccessor(BaseAccessor):
         async with self.app.database.session() as session:
             return await session.scalar(stmt)
 
-    async def get_alive_players(self, game_id: int) -> list[PlayerModel]:
-        stmt = (
-            select(PlayerModel)
-            .where(
-                and_(PlayerModel.game_id == game_id, PlayerModel.alive == True)
-            )
-            .order_by(PlayerModel.id)
-        )
-        async with self.app.database.session() as session:
-            return list(await session.scalars(stmt))
-
-    async def get_all_players(self, game_id: int) -> list[PlayerModel]:
-        stmt = (
-            select(PlayerModel)
-            .where(and_(PlayerModel.game_id == game_id))
-            .order_by(PlayerModel.id)
-        )
-        async with self.app.database.session() as session:
-            return list(await session.scalars(stmt))
-
-    async def update_player_balance(
-        self, player_id: int, value: int, mode: str
-    ) -> None:
-        stmt = select(PlayerModel).where(PlayerModel.id == player_id)
-        async with self.app.database.session() as session:
-            player = await session.scalar(stmt)
-            if mode == "increase":
-                player.balance += value
-            elif mode == "decrease":
-                if player.balance >= value:
-                    player.balance -= value
-                else:
-                    player.balance = 0
-            await session.commit()
-
     async def player_dead(self, player_id: int) -> None:
         stmt = (
             update(PlayerModel)
@@ -168,33 +394,27 @@ class GameAccessor(BaseAccessor):
             )
             session.add(share)
             await session.commit()
+        self._invalidate_share_catalog()
         return share
 
     async def get_shares(self) -> list[ShareModel]:
-        async with self.app.database.session() as session:
-            return list(
-                await session.scalars(
-                    select(ShareModel).order_by(ShareModel.id)
-                )
-            )
+        by_id, _ = await self._get_share_catalog()
+        return list(by_id.values())
 
-    async def get_share_by_id(self, share_id: int) -> ShareModel:
-        async with self.app.database.session() as session:
-            return await session.scalar(
-                select(ShareModel).where(ShareModel.id == share_id)
-            )
+    async def get_share_by_id(self, share_id: int) -> ShareModel | None:
+        by_id, _ = await self._get_share_catalog()
+        return by_id.get(share_id)
 
-    async def get_share_by_name(self, share_name: str) -> ShareModel:
-        async with self.app.database.session() as session:
-            return await session.scalar(
-                select(ShareModel).where(ShareModel.name == share_name)
-            )
+    async def get_share_by_name(self, share_name: str) -> ShareModel | None:
+        _, by_name = await self._get_share_catalog()
+        return by_name.get(share_name)
 
     async def delete_share(self, share_id: int) -> None:
         stmt = delete(ShareModel).where(ShareModel.id == share_id)
         async with self.app.database.session() as session:
             await session.execute(stmt)
             await session.commit()
+        self._invalidate_share_catalog()
 
     async def update_start_share_price(self, share_id: int, price: int) -> None:
         stmt = (
@@ -205,148 +425,271 @@ class GameAccessor(BaseAccessor):
         async with self.app.database.session() as session:
             await session.execute(stmt)
             await session.commit()
-
-    async def get_game_inventory(
-        self, game_id: int
-    ) -> list[GameInventoryModel]:
-        async with self.app.database.session() as session:
-            return list(
-                await session.scalars(
-                    select(GameInventoryModel)
-                    .where(GameInventoryModel.game_id == game_id)
-                    .order_by(GameInventoryModel.id)
-                )
-            )
-
-    async def get_game_inventory_item_by_share_id(
-        self, share_id: int, game_id: int
-    ) -> GameInventoryModel:
-        stmt = select(GameInventoryModel).where(
-            GameInventoryModel.share_id == share_id,
-            GameInventoryModel.game_id == game_id,
+        self._invalidate_share_catalog()
+
+    async def reprice_shares(
+        self,
+        game_id: int,
+        turn: int,
+        price_seed: str,
+        prices: dict[int, int],
+        price_model: str,
+        minimal_price: int,
+        maximum_price: int,
+    ) -> dict[int, int]:
+        if not prices:
+            return {}
+        share_ids = sorted(prices)
+        # Seeded by the game's secret and the turn, so a replayed turn
+        # yields the same prices but players cannot compute them upfront
+        [new_row] = get_price_model(price_model).step(
+            prices=[[prices[share_id] for share_id in share_ids]],
+            seeds=[f"{price_seed}:{turn}"],
+            minimal_price=minimal_price,
+            maximum_price=maximum_price,
         )
-        async with self.app.database.session() as session:
-            return await session.scalar(stmt)
-
-    async def add_share_to_inventory(
-        self, share_id: int, game_id: int, share_price: int
-    ) -> None:
-        async with self.app.database.session() as session:
-            game_inventory_item = GameInventoryModel(
-                share_id=share_id,
-                game_id=game_id,
-                price=share_price,
-            )
-            session.add(game_inventory_item)
-            await session.commit()
-
-    async def change_item_price(
-        self, game_id, share_id, share_price: int
-    ) -> None:
+        prices = dict(zip(share_ids, new_row, strict=True))
+        new_prices = values(
+            column("share_id", Integer),
+            column("price", Integer),
+            name="new_prices",
+        ).data(list(prices.items()))
         stmt = (
             update(GameInventoryModel)
             .where(
-                and_(
-                    GameInventoryModel.share_id == share_id,
-                    GameInventoryModel.game_id == game_id,
-                )
+                GameInventoryModel.game_id == game_id,
+                GameInventoryModel.share_id == new_prices.c.share_id,
             )
-            .values(price=share_price)
+            .values(price=new_prices.c.price)
         )
         async with self.app.database.session() as session:
             await session.execute(stmt)
             await session.commit()
-
-    async def get_player_inventory(
-        self, player_id: int
-    ) -> list[PlayerInventoryModel]:
-        async with self.app.database.session() as session:
-            return list(
-                await session.scalars(
-                    select(PlayerInventoryModel)
-                    .where(PlayerInventoryModel.share_owner == player_id)
-                    .order_by(PlayerInventoryModel.id)
-                )
+        return prices
+
+    async def get_game_board(self, game_id: int) -> GameState | None:
+        inventory_stmt = (
+            select(
+                GameModel.chat_id,
+                GameModel.last_turn,
+                GameModel.price_seed,
+                GameInventoryModel.share_id,
+                ShareModel.name,
+                GameInventoryModel.price,
             )
-
-    async def get_count_of_items(self, share_id: int, player_id: int) -> int:
-        stmt = (
-            select(func.count(PlayerInventoryModel.share_id))
-            .select_from(PlayerInventoryModel)
-            .where(
-                and_(
-                    PlayerInventoryModel.share_id == share_id,
-                    PlayerInventoryModel.share_owner == player_id,
-                )
+            .outerjoin(
+                GameInventoryModel, GameInventoryModel.game_id == GameModel.id
             )
+            .outerjoin(ShareModel, ShareModel.id == GameInventoryModel.share_id)
+            .where(GameModel.id == game_id)
+            .order_by(GameInventoryModel.id)
         )
-        async with self.app.database.session() as session:
-            return await session.scalar(stmt)
-
-    async def get_player_shares(self, player_id: int) -> list[str]:
-        stmt = (
-            select(ShareModel)
-            .distinct()
-            .join(
+        holdings_filter = PlayerInventoryModel.quantity > 0
+        players_stmt = (
+            select(
+                PlayerModel.id,
+                PlayerModel.balance,
+                PlayerModel.alive,
+                UserModel.id.label("user_id"),
+                UserModel.telegram_id,
+                UserModel.first_name,
+                UserModel.nickname,
+                func.array_agg(PlayerInventoryModel.share_id)
+                .filter(holdings_filter)
+                .label("share_ids"),
+                func.array_agg(PlayerInventoryModel.quantity)
+                .filter(holdings_filter)
+                .label("quantities"),
+            )
+            .join(UserModel, UserModel.id == PlayerModel.user_id)
+            .outerjoin(
                 PlayerInventoryModel,
-                ShareModel.id == PlayerInventoryModel.share_id,
+                PlayerInventoryModel.share_owner == PlayerModel.id,
             )
-            .where(PlayerInventoryModel.share_owner == player_id)
-        ).order_by(ShareModel.id)
-        async with self.app.database.session() as session:
-            return list(await session.scalars(stmt))
-
-    async def add_share_to_player_inventory(
-        self, share_id: int, player_id: int
-    ) -> None:
+            .where(PlayerModel.game_id == game_id)
+            .group_by(PlayerModel.id, UserModel.id)
+            .order_by(PlayerModel.id)
+        )
         async with self.app.database.session() as session:
-            player_inventory_item = PlayerInventoryModel(
-                share_id=share_id,
-                share_owner=player_id,
+            inventory = (await session.execute(inventory_stmt)).all()
+            if not inventory:
+                return None
+            players = (await session.execute(players_stmt)).all()
+
+        state = GameState(
+            game_id=game_id,
+            chat_id=inventory[0].chat_id,
+            turn=inventory[0].last_turn,
+            price_seed=inventory[0].price_seed,
+        )
+        for item in inventory:
+            if item.share_id is not None:
+                state.shares[item.share_id] = ShareState(
+                    share_id=item.share_id, name=item.name, price=item.price
+                )
+        for player in players:
+            state.add_player(
+                PlayerState(
+                    id=player.id,
+                    user_id=player.user_id,
+                    telegram_id=player.telegram_id,
+                    first_name=player.first_name,
+                    nickname=player.nickname,
+                    balance=player.balance,
+                    alive=player.alive,
+                    holdings=dict(
+                        zip(
+                            player.share_ids or [],
+                            player.quantities or [],
+                            strict=True,
+                        )
+                    ),
+                )
             )
-            session.add(player_inventory_item)
-
-            stmt = select(PlayerModel).where(PlayerModel.id == player_id)
-            player = await session.scalar(stmt)
-
-            stmt = select(GameInventoryModel).where(
+        return state
+
+    @staticmethod
+    def _standings_query(game_id: int):
+        holdings = (
+            select(
+                PlayerInventoryModel.share_owner,
+                func.sum(
+                    PlayerInventoryModel.quantity * GameInventoryModel.price
+                ).label("value"),
+            )
+            .join(
+                PlayerModel, PlayerModel.id == PlayerInventoryModel.share_owner
+            )
+            .join(
+                GameInventoryModel,
                 and_(
-                    GameInventoryModel.game_id == player.game_id,
-                    GameInventoryModel.share_id == share_id,
-                )
+                    GameInventoryModel.game_id == PlayerModel.game_id,
+                    GameInventoryModel.share_id
+                    == PlayerInventoryModel.share_id,
+                ),
             )
-            game_inventory_price = (await session.scalar(stmt)).price
-
-            player.balance -= game_inventory_price
-
-            await session.commit()
+            .where(PlayerModel.game_id == game_id)
+            .group_by(PlayerInventoryModel.share_owner)
+            .subquery("holdings")
+        )
+        total_value = PlayerModel.balance + func.coalesce(holdings.c.value, 0)
+        return (
+            select(
+                PlayerModel.id.label("player_id"),
+                UserModel.id.label("user_id"),
+                UserModel.first_name,
+                UserModel.nickname,
+                total_value.label("total_value"),
+                func.rank().over(order_by=total_value.desc()).label("rank"),
+            )
+            .join(UserModel, UserModel.id == PlayerModel.user_id)
+            .outerjoin(holdings, holdings.c.share_owner == PlayerModel.id)
+            .where(PlayerModel.game_id == game_id)
+        )
 
-    async def remove_share_from_player_inventory(
-        self, share_id: int, player_id: int
-    ) -> None:
+    async def compute_standings(self, game_id: int) -> list[PlayerStanding]:
+        # Cash plus holdings at current prices, ranked in one round trip
+        standings = self._standings_query(game_id).subquery("standings")
+        stmt = select(standings).order_by(
+            standings.c.rank, standings.c.player_id
+        )
         async with self.app.database.session() as session:
-            item_stmt = select(PlayerInventoryModel.id).where(
-                PlayerInventoryModel.share_id == share_id,
-                PlayerInventoryModel.share_owner == player_id,
+            rows = (await session.execute(stmt)).all()
+        return [
+            PlayerStanding(
+                player_id=row.player_id,
+                user_id=row.user_id,
+                first_name=row.first_name,
+                nickname=row.nickname,
+                total_value=row.total_value,
+                rank=row.rank,
             )
-            id_ = await session.scalar(item_stmt)
-            stmt = delete(PlayerInventoryModel).where(
-                PlayerInventoryModel.share_id == share_id,
-                PlayerInventoryModel.id == id_,
+            for row in rows
+        ]
+
+    async def apply_trades(
+        self, trades: dict[tuple[int, int], list[int]]
+    ) -> set[int]:
+        # Net (player, share) deltas of a flush. Memory checked every step,
+        # so only each player's final position needs to hold: one guarded
+        # balance change plus all holdings, applied per player or not at all
+        if not trades:
+            return set()
+        cash: dict[int, int] = {}
+        for (player_id, _), (_, amount) in trades.items():
+            cash[player_id] = cash.get(player_id, 0) + amount
+        player_cash = values(
+            column("player_id", Integer),
+            column("cash", Integer),
+            name="player_cash",
+        ).data(list(cash.items()))
+        deltas = (
+            select(
+                values(
+                    column("player_id", Integer),
+                    column("share_id", Integer),
+                    column("quantity", Integer),
+                    name="delta_rows",
+                ).data(
+                    [
+                        (player_id, share_id, quantity)
+                        for (player_id, share_id), (
+                            quantity,
+                            _,
+                        ) in trades.items()
+                    ]
+                )
             )
-            await session.execute(stmt)
-
-            stmt = select(PlayerModel).where(PlayerModel.id == player_id)
-            player = await session.scalar(stmt)
-
-            stmt = select(GameInventoryModel).where(
+        ).cte("deltas")
+        held = (
+            select(deltas.c.player_id)
+            .outerjoin(
+                PlayerInventoryModel,
                 and_(
-                    GameInventoryModel.game_id == player.game_id,
-                    GameInventoryModel.share_id == share_id,
+                    PlayerInventoryModel.share_owner == deltas.c.player_id,
+                    PlayerInventoryModel.share_id == deltas.c.share_id,
+                ),
+            )
+            .group_by(deltas.c.player_id)
+            .having(
+                func.bool_and(
+                    func.coalesce(PlayerInventoryModel.quantity, 0)
+                    + deltas.c.quantity
+                    >= 0
                 )
             )
-            game_inventory_price = (await session.scalar(stmt)).price
-
-            player.balance += game_inventory_price
-
+            .cte("held")
+        )
+        charged = (
+            update(PlayerModel)
+            .where(
+                PlayerModel.id == player_cash.c.player_id,
+                PlayerModel.id.in_(select(held.c.player_id)),
+                PlayerModel.balance + player_cash.c.cash >= 0,
+            )
+            .values(balance=PlayerModel.balance + player_cash.c.cash)
+            .returning(PlayerModel.id)
+            .cte("charged")
+        )
+        holdings_stmt = insert(PlayerInventoryModel).from_select(
+            ["share_id", "share_owner", "quantity"],
+            select(
+                deltas.c.share_id, deltas.c.player_id, deltas.c.quantity
+            ).join(charged, charged.c.id == deltas.c.player_id),
+        )
+        holdings_stmt = holdings_stmt.on_conflict_do_update(
+            constraint="uq_player_inventory_share_owner_share_id",
+            set_={
+                "quantity": PlayerInventoryModel.quantity
+                + holdings_stmt.excluded.quantity
+            },
+        )
+        holdings = holdings_stmt.returning(
+            PlayerInventoryModel.share_owner
+        ).cte("holdings")
+        stmt = select(charged.c.id).add_cte(holdings)
+        # Own short transaction, one round trip for every dirty game
+        async with self.app.database.session(join=False) as session:
+            applied = set(await session.scalars(stmt))
             await session.commit()
+        return applied
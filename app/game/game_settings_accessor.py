@@ -1,81 +1,155 @@
-from sqlalchemy import select, update
+import asyncio
+import typing
+from dataclasses import dataclass
+
+import asyncpg
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.base.base_accessor import BaseAccessor
 from app.game.models import GameSettingsModel
 
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+SETTINGS_CHANNEL = "game_settings"
+# seconds between listener health checks and between reconnect attempts
+LISTEN_PING_INTERVAL = 30
+LISTEN_RETRY_DELAY = 5
+
+
+@dataclass(frozen=True, slots=True)
+class GameSettings:
+    turn_timer: int
+    turn_counter: int
+    player_balance: int
+    shares_minimal_price: int
+    shares_maximum_price: int
+    price_model: str
+
 
 class GameSettingsAccessor(BaseAccessor):
-    async def get_turn_timer(self):
-        stmt = select(GameSettingsModel.turn_timer)
-        async with self.app.database.session() as session:
-            return (await session.execute(stmt)).one()[0]
+    def __init__(self, app: "Application", *args, **kwargs) -> None:
+        super().__init__(app, *args, **kwargs)
+        self.snapshot: GameSettings | None = None
+        self._listener: asyncio.Task | None = None
+        self._refresh_tasks: set[asyncio.Task] = set()
 
-    async def update_turn_timer(self, turn_timer: int):
-        stmt = (
-            update(GameSettingsModel)
-            .where(GameSettingsModel.id == 1)
-            .values(turn_timer=turn_timer)
-        )
-        async with self.app.database.session() as session:
-            await session.execute(stmt)
-            await session.commit()
+    async def connect(self, app: "Application"):
+        await self.refresh()
+        # Other processes announce settings changes with NOTIFY
+        self._listener = asyncio.create_task(self._listen())
 
-    async def get_turn_counter(self):
-        stmt = select(GameSettingsModel.turn_counter).limit(1)
-        async with self.app.database.session() as session:
-            return (await session.execute(stmt)).one()[0]
+    async def disconnect(self, app: "Application"):
+        tasks = list(self._refresh_tasks)
+        if self._listener:
+            tasks.append(self._listener)
+            self._listener = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
-    async def update_turn_counter(self, turn_counter: int):
-        stmt = (
-            update(GameSettingsModel)
-            .where(GameSettingsModel.id == 1)
-            .values(turn_counter=turn_counter)
-        )
-        async with self.app.database.session() as session:
-            await session.execute(stmt)
-            await session.commit()
+    async def _listen(self) -> None:
+        # A connection of its own, so LISTEN never takes a pool slot,
+        # reopened whenever it drops
+        dsn = self.app.database.engine.url.set(
+            drivername="postgresql"
+        ).render_as_string(hide_password=False)
+        reconnected = False
+        while True:
+            try:
+                connection = await asyncpg.connect(dsn)
+            except Exception as e:
+                self.logger.exception("settings listener failed", exc_info=e)
+                await asyncio.sleep(LISTEN_RETRY_DELAY)
+                continue
+            try:
+                await connection.add_listener(
+                    SETTINGS_CHANNEL, self._on_settings_notify
+                )
+                if reconnected:
+                    # Changes made while nobody listened were missed
+                    await self._refresh_logged()
+                while not connection.is_closed():
+                    await asyncio.sleep(LISTEN_PING_INTERVAL)
+                    await connection.execute(
+                        "SELECT 1", timeout=LISTEN_RETRY_DELAY
+                    )
+            except Exception as e:
+                self.logger.exception("settings listener lost", exc_info=e)
+            finally:
+                connection.terminate()
+            reconnected = True
+            await asyncio.sleep(LISTEN_RETRY_DELAY)
 
-    async def get_player_balance(self):
-        stmt = select(GameSettingsModel.player_balance)
-        async with self.app.database.session() as session:
-            return (await session.execute(stmt)).one()[0]
+    def _on_settings_notify(self, connection, pid, channel, payload) -> None:
+        task = asyncio.create_task(self._refresh_logged())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
 
-    async def update_player_balance(self, player_balance: int):
-        stmt = (
-            update(GameSettingsModel)
-            .where(GameSettingsModel.id == 1)
-            .values(player_balance=player_balance)
-        )
-        async with self.app.database.session() as session:
-            await session.execute(stmt)
-            await session.commit()
+    async def _refresh_logged(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            self.logger.exception("settings refresh failed", exc_info=e)
+
+    async def _notify_settings_changed(self, session: AsyncSession) -> None:
+        await session.execute(select(func.pg_notify(SETTINGS_CHANNEL, "")))
 
-    async def get_shares_minimal_price(self):
-        stmt = select(GameSettingsModel.shares_minimal_price)
+    async def refresh(self) -> GameSettings:
+        self.snapshot = await self.get_all()
+        return self.snapshot
+
+    async def get_all(self) -> GameSettings:
+        stmt = select(GameSettingsModel).order_by(GameSettingsModel.id).limit(1)
         async with self.app.database.session() as session:
-            return (await session.execute(stmt)).one()[0]
+            settings = await session.scalar(stmt)
+        return self._to_snapshot(settings)
 
-    async def update_shares_minimal_price(self, shares_minimal_price: int):
+    @staticmethod
+    def _to_snapshot(settings: GameSettingsModel) -> GameSettings:
+        return GameSettings(
+            turn_timer=settings.turn_timer,
+            turn_counter=settings.turn_counter,
+            player_balance=settings.player_balance,
+            shares_minimal_price=settings.shares_minimal_price,
+            shares_maximum_price=settings.shares_maximum_price,
+            price_model=settings.price_model,
+        )
+
+    async def update_many(self, **values: int | str) -> GameSettings:
         stmt = (
             update(GameSettingsModel)
             .where(GameSettingsModel.id == 1)
-            .values(shares_minimal_price=shares_minimal_price)
+            .values(**values)
+            .returning(GameSettingsModel)
         )
         async with self.app.database.session() as session:
-            await session.execute(stmt)
+            settings = self._to_snapshot(await session.scalar(stmt))
+            await self._notify_settings_changed(session)
             await session.commit()
 
-    async def get_shares_maximum_price(self):
-        stmt = select(GameSettingsModel.shares_maximum_price)
-        async with self.app.database.session() as session:
-            return (await session.execute(stmt)).one()[0]
+        def publish() -> None:
+            self.snapshot = settings
+
+        # A rolled back change must never reach the snapshot
+        self.app.database.on_commit(publish)
+        return settings
+
+    async def update_turn_timer(self, turn_timer: int):
+        await self.update_many(turn_timer=turn_timer)
+
+    async def update_turn_counter(self, turn_counter: int):
+        await self.update_many(turn_counter=turn_counter)
+
+    async def update_player_balance(self, player_balance: int):
+        await self.update_many(player_balance=player_balance)
+
+    async def update_shares_minimal_price(self, shares_minimal_price: int):
+        await self.update_many(shares_minimal_price=shares_minimal_price)
 
     async def update_shares_maximum_price(self, shares_maximum_price: int):
-        stmt = (
-            update(GameSettingsModel)
-            .where(GameSettingsModel.id == 1)
-            .values(shares_maximum_price=shares_maximum_price)
-        )
-        async with self.app.database.session() as session:
-            await session.execute(stmt)
-            await session.commit()
+        await self.update_many(shares_maximum_price=shares_maximum_price)
+
+    async def update_price_model(self, price_model: str):
+        await self.update_many(price_model=price_model)
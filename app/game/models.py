@@ -1,13 +1,32 @@
 import datetime
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey
+from sqlalchemy import (
+    BigInteger,
+    CheckConstraint,
+    DateTime,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column
 
+from app.game.price_engine import new_price_seed
 from app.store.database.sqlalchemy_database import BaseModel
 
 
 class PlayerModel(BaseModel):
     __tablename__ = "players"
+    __table_args__ = (
+        UniqueConstraint(
+            "game_id", "user_id", name="uq_players_game_id_user_id"
+        ),
+        Index(
+            "ix_players_game_id_alive",
+            "game_id",
+            postgresql_where=text("alive"),
+        ),
+    )
     id: Mapped[int] = mapped_column(
         primary_key=True, autoincrement=True, init=False
     )
@@ -32,6 +51,11 @@ class ShareModel(BaseModel):
 
 class GameInventoryModel(BaseModel):
     __tablename__ = "game_inventory"
+    __table_args__ = (
+        UniqueConstraint(
+            "game_id", "share_id", name="uq_game_inventory_game_id_share_id"
+        ),
+    )
     id: Mapped[int] = mapped_column(
         primary_key=True, autoincrement=True, init=False
     )
@@ -49,6 +73,15 @@ class GameInventoryModel(BaseModel):
 
 class GameModel(BaseModel):
     __tablename__ = "games"
+    __table_args__ = (
+        # One active game per chat
+        Index(
+            "ix_games_chat_id_active",
+            "chat_id",
+            unique=True,
+            postgresql_where=text("is_active"),
+        ),
+    )
     id: Mapped[int] = mapped_column(
         primary_key=True, autoincrement=True, init=False
     )
@@ -61,20 +94,67 @@ class GameModel(BaseModel):
     )
     is_active: Mapped[bool] = mapped_column(default=True)
     last_turn: Mapped[int] = mapped_column(default=0)
+    price_seed: Mapped[str] = mapped_column(
+        nullable=False, default_factory=new_price_seed
+    )
 
 
 class PlayerInventoryModel(BaseModel):
     __tablename__ = "player_inventory"
+    __table_args__ = (
+        UniqueConstraint(
+            "share_owner",
+            "share_id",
+            name="uq_player_inventory_share_owner_share_id",
+        ),
+        CheckConstraint("quantity >= 0", name="ck_player_inventory_quantity"),
+    )
     id: Mapped[int] = mapped_column(
         primary_key=True, autoincrement=True, init=False
     )
     share_id: Mapped[int] = mapped_column(
-        ForeignKey("game_inventory.id", ondelete="CASCADE"),
+        ForeignKey("shares.id", ondelete="CASCADE"),
         nullable=False,
     )
     share_owner: Mapped[int] = mapped_column(
         BigInteger, ForeignKey("players.id", ondelete="CASCADE"), nullable=False
     )
+    quantity: Mapped[int] = mapped_column(default=1)
+
+
+class GameResultModel(BaseModel):
+    __tablename__ = "game_results"
+    __table_args__ = (
+        UniqueConstraint(
+            "game_id", "player_id", name="uq_game_results_game_id_player_id"
+        ),
+        # Leaderboards read the top of these indexes and stop
+        Index("ix_game_results_total_value", text("total_value DESC")),
+        Index(
+            "ix_game_results_chat_id_total_value",
+            "chat_id",
+            text("total_value DESC"),
+        ),
+    )
+    id: Mapped[int] = mapped_column(
+        primary_key=True, autoincrement=True, init=False
+    )
+    game_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("games.id", ondelete="CASCADE"), nullable=False
+    )
+    chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    player_id: Mapped[int] = mapped_column(
+        ForeignKey("players.id", ondelete="CASCADE"), nullable=False
+    )
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    rank: Mapped[int] = mapped_column(nullable=False)
+    total_value: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    is_winner: Mapped[bool] = mapped_column(nullable=False)
+    finished_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=False), nullable=False
+    )
 
 
 class GameSettingsModel(BaseModel):
@@ -87,3 +167,4 @@ class GameSettingsModel(BaseModel):
     player_balance: Mapped[int] = mapped_column(default=1000)
     shares_minimal_price: Mapped[int] = mapped_column(default=1)
     shares_maximum_price: Mapped[int] = mapped_column(default=500)
+    price_model: Mapped[str] = mapped_column(default="uniform")
@@ -0,0 +1,162 @@
+import math
+import random
+import secrets
+from abc import ABC, abstractmethod
+from collections.abc import Hashable, Sequence
+from dataclasses import dataclass
+from enum import Enum
+
+
+class PriceModelType(Enum):
+    uniform = "uniform"
+    random_walk = "random_walk"
+    mean_reverting = "mean_reverting"
+    correlated = "correlated"
+
+
+def new_price_seed() -> str:
+    # Kept secret per game: public ids and turns alone must not predict prices
+    return secrets.token_hex(16)
+
+
+@dataclass(frozen=True, slots=True)
+class PriceModel(ABC):
+    def step(
+        self,
+        prices: Sequence[Sequence[int]],
+        seeds: Sequence[Hashable],
+        minimal_price: int,
+        maximum_price: int,
+    ) -> list[list[int]]:
+        # One row of share prices per game, every row with its own seed,
+        # so a game gets the same prices however the batch is composed
+        rng = random.Random()
+        result = []
+        for row, seed in zip(prices, seeds, strict=True):
+            rng.seed(seed)
+            result.append(
+                self.step_game(row, rng, minimal_price, maximum_price)
+            )
+        return result
+
+    @abstractmethod
+    def step_game(
+        self,
+        prices: Sequence[int],
+        rng: random.Random,
+        minimal_price: int,
+        maximum_price: int,
+    ) -> list[int]: ...
+
+
+@dataclass(frozen=True, slots=True)
+class UniformModel(PriceModel):
+    def step_game(
+        self,
+        prices: Sequence[int],
+        rng: random.Random,
+        minimal_price: int,
+        maximum_price: int,
+    ) -> list[int]:
+        span = maximum_price - minimal_price + 1
+        random_ = rng.random
+        return [minimal_price + int(random_() * span) for _ in prices]
+
+
+@dataclass(frozen=True, slots=True)
+class RandomWalkModel(PriceModel):
+    volatility: float = 0.25
+    drift: float = 0.0
+
+    def step_game(
+        self,
+        prices: Sequence[int],
+        rng: random.Random,
+        minimal_price: int,
+        maximum_price: int,
+    ) -> list[int]:
+        mu = self.drift - self.volatility**2 / 2
+        volatility = self.volatility
+        # Multiplicative models can never leave zero, so their floor is at
+        # least 1
+        floor = max(minimal_price, 1)
+        gauss, exp = rng.gauss, math.exp
+        return [
+            min(
+                max(
+                    round(max(price, 1) * exp(mu + volatility * gauss())),
+                    floor,
+                ),
+                maximum_price,
+            )
+            for price in prices
+        ]
+
+
+@dataclass(frozen=True, slots=True)
+class MeanRevertingModel(PriceModel):
+    speed: float = 0.3
+    volatility: float = 0.2
+
+    def step_game(
+        self,
+        prices: Sequence[int],
+        rng: random.Random,
+        minimal_price: int,
+        maximum_price: int,
+    ) -> list[int]:
+        mean = math.log(max((minimal_price + maximum_price) / 2, 1))
+        speed, volatility = self.speed, self.volatility
+        # Multiplicative like RandomWalkModel, so the floor is at least 1
+        floor = max(minimal_price, 1)
+        gauss, exp, log = rng.gauss, math.exp, math.log
+        result = []
+        for price in prices:
+            log_price = log(max(price, 1))
+            log_price += speed * (mean - log_price) + volatility * gauss()
+            result.append(min(max(round(exp(log_price)), floor), maximum_price))
+        return result
+
+
+@dataclass(frozen=True, slots=True)
+class CorrelatedModel(PriceModel):
+    volatility: float = 0.25
+    correlation: float = 0.5
+
+    def step_game(
+        self,
+        prices: Sequence[int],
+        rng: random.Random,
+        minimal_price: int,
+        maximum_price: int,
+    ) -> list[int]:
+        # Every share moves with one market factor plus its own noise
+        volatility = self.volatility
+        market = volatility * math.sqrt(self.correlation) * rng.gauss()
+        own_weight = volatility * math.sqrt(1 - self.correlation)
+        mu = -(volatility**2) / 2 + market
+        # Multiplicative like RandomWalkModel, so the floor is at least 1
+        floor = max(minimal_price, 1)
+        gauss, exp = rng.gauss, math.exp
+        return [
+            min(
+                max(
+                    round(max(price, 1) * exp(mu + own_weight * gauss())),
+                    floor,
+                ),
+                maximum_price,
+            )
+            for price in prices
+        ]
+
+
+PRICE_MODELS: dict[str, PriceModel] = {
+    PriceModelType.uniform.value: UniformModel(),
+    PriceModelType.random_walk.value: RandomWalkModel(),
+    PriceModelType.mean_reverting.value: MeanRevertingModel(),
+    PriceModelType.correlated.value: CorrelatedModel(),
+}
+
+
+def get_price_model(name: str) -> PriceModel:
+    return PRICE_MODELS.get(name, PRICE_MODELS[PriceModelType.uniform.value])
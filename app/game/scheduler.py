@@ -0,0 +1,108 @@
+import asyncio
+import heapq
+import time
+from collections.abc import Awaitable, Callable
+from logging import Logger
+
+# Rebuild the heap once cancelled entries outnumber live ones by this much
+COMPACT_THRESHOLD = 64
+
+
+class TurnScheduler:
+    def __init__(
+        self,
+        on_deadline: Callable[[int], Awaitable[None]],
+        logger: Logger,
+    ) -> None:
+        self.on_deadline = on_deadline
+        self.logger = logger
+        self._heap: list[tuple[float, int, int]] = []
+        # game_id -> (deadline, seq) of its only live heap entry
+        self._deadlines: dict[int, tuple[float, int]] = {}
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self._timer: asyncio.Task | None = None
+        self._firing: set[asyncio.Task] = set()
+        self.fired = 0
+
+    def start(self) -> None:
+        self._timer = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = list(self._firing)
+        if self._timer:
+            tasks.append(self._timer)
+            self._timer = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def schedule(self, game_id: int, delay: float) -> None:
+        self._seq += 1
+        deadline = time.monotonic() + delay
+        self._deadlines[game_id] = (deadline, self._seq)
+        heapq.heappush(self._heap, (deadline, self._seq, game_id))
+        if self._heap[0][1] == self._seq:
+            self._wakeup.set()
+        self._compact()
+
+    def reschedule(self, game_id: int, delay: float) -> bool:
+        if game_id not in self._deadlines:
+            return False
+        self.schedule(game_id=game_id, delay=delay)
+        return True
+
+    def cancel(self, game_id: int) -> None:
+        self._deadlines.pop(game_id, None)
+
+    def is_scheduled(self, game_id: int) -> bool:
+        return game_id in self._deadlines
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": len(self._deadlines),
+            "heap_size": len(self._heap),
+            "firing": len(self._firing),
+            "fired": self.fired,
+        }
+
+    def _compact(self) -> None:
+        if len(self._heap) - len(self._deadlines) < COMPACT_THRESHOLD:
+            return
+        self._heap = [
+            (deadline, seq, game_id)
+            for game_id, (deadline, seq) in self._deadlines.items()
+        ]
+        heapq.heapify(self._heap)
+
+    def _is_live(self, entry: tuple[float, int, int]) -> bool:
+        deadline, seq, game_id = entry
+        return self._deadlines.get(game_id) == (deadline, seq)
+
+    async def _run(self) -> None:
+        while True:
+            while self._heap and not self._is_live(self._heap[0]):
+                heapq.heappop(self._heap)
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            delay = self._heap[0][0] - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except TimeoutError:
+                    pass
+                continue
+            _, _, game_id = heapq.heappop(self._heap)
+            del self._deadlines[game_id]
+            task = asyncio.create_task(self._fire(game_id))
+            self._firing.add(task)
+            task.add_done_callback(self._firing.discard)
+
+    async def _fire(self, game_id: int) -> None:
+        self.fired += 1
+        try:
+            await self.on_deadline(game_id)
+        except Exception as e:
+            self.logger.exception("turn transition failed", exc_info=e)
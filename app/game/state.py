@@ -0,0 +1,117 @@
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class ShareState:
+    share_id: int
+    name: str
+    price: int
+
+
+@dataclass(slots=True)
+class PlayerState:
+    id: int
+    user_id: int
+    telegram_id: int
+    first_name: str
+    nickname: str
+    balance: int
+    alive: bool = True
+    holdings: dict[int, int] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class PlayerStanding:
+    player_id: int
+    user_id: int
+    first_name: str
+    nickname: str
+    total_value: int
+    rank: int
+
+
+@dataclass(slots=True)
+class GameState:
+    game_id: int
+    chat_id: int
+    turn: int
+    price_seed: str = ""
+    shares: dict[int, ShareState] = field(default_factory=dict)
+    players: dict[int, PlayerState] = field(default_factory=dict)
+    # (player_id, share_id) -> [quantity, cash] not yet written to the db
+    pending_trades: dict[tuple[int, int], list[int]] = field(
+        default_factory=dict
+    )
+
+    @property
+    def is_dirty(self) -> bool:
+        return bool(self.pending_trades)
+
+    def add_player(self, player: PlayerState) -> None:
+        self.players[player.id] = player
+
+    def get_player_by_telegram_id(self, telegram_id: int) -> PlayerState | None:
+        for player in self.players.values():
+            if player.telegram_id == telegram_id:
+                return player
+        return None
+
+    def alive_players(self) -> list[PlayerState]:
+        return [player for player in self.players.values() if player.alive]
+
+    def inventory(self) -> list[list]:
+        return [
+            [share.name, share.share_id, share.price]
+            for share in self.shares.values()
+        ]
+
+    def set_prices(self, prices: dict[int, int]) -> None:
+        for share_id, price in prices.items():
+            self.shares[share_id].price = price
+
+    def buy(self, telegram_id: int, share_id: int) -> bool:
+        player = self.get_player_by_telegram_id(telegram_id)
+        share = self.shares.get(share_id)
+        if not player or not player.alive or not share:
+            return False
+        if player.balance < share.price:
+            return False
+        player.balance -= share.price
+        player.holdings[share_id] = player.holdings.get(share_id, 0) + 1
+        self._add_pending_trade((player.id, share_id), 1, -share.price)
+        return True
+
+    def sell(self, telegram_id: int, share_id: int) -> bool:
+        player = self.get_player_by_telegram_id(telegram_id)
+        share = self.shares.get(share_id)
+        if not player or not player.alive or not share:
+            return False
+        if not player.holdings.get(share_id):
+            return False
+        player.balance += share.price
+        player.holdings[share_id] -= 1
+        if not player.holdings[share_id]:
+            del player.holdings[share_id]
+        self._add_pending_trade((player.id, share_id), -1, share.price)
+        return True
+
+    def total_value(self, player: PlayerState) -> int:
+        return player.balance + sum(
+            self.shares[share_id].price * count
+            for share_id, count in player.holdings.items()
+        )
+
+    def take_changes(self) -> dict[tuple[int, int], list[int]]:
+        trades, self.pending_trades = self.pending_trades, {}
+        return trades
+
+    def restore_changes(self, trades: dict[tuple[int, int], list[int]]) -> None:
+        for key, (quantity, cash) in trades.items():
+            self._add_pending_trade(key, quantity, cash)
+
+    def _add_pending_trade(
+        self, key: tuple[int, int], quantity: int, cash: int
+    ) -> None:
+        pending = self.pending_trades.setdefault(key, [0, 0])
+        pending[0] += quantity
+        pending[1] += cash
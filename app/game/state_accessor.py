@@ -0,0 +1,136 @@
+import asyncio
+import typing
+
+from app.base.base_accessor import BaseAccessor
+from app.game.state import GameState
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+FLUSH_INTERVAL = 1
+
+
+class GameStateAccessor(BaseAccessor):
+    def __init__(self, app: "Application", *args, **kwargs) -> None:
+        super().__init__(app, *args, **kwargs)
+        self.states: dict[int, GameState] = {}
+        self._chat_games: dict[int, int] = {}
+        self._loading: dict[int, asyncio.Task] = {}
+        self._flusher: asyncio.Task | None = None
+        # A flush must land before the next one takes newer deltas
+        self._flush_lock = asyncio.Lock()
+
+    async def connect(self, app: "Application"):
+        self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def disconnect(self, app: "Application"):
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    async def get(self, game_id: int) -> GameState | None:
+        state = self.states.get(game_id)
+        if state:
+            return state
+        task = self._loading.get(game_id)
+        if task is None:
+            task = asyncio.create_task(self._load(game_id))
+            self._loading[game_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(game_id, None))
+        return await task
+
+    def add(self, state: GameState) -> None:
+        self.states[state.game_id] = state
+        self._chat_games[state.chat_id] = state.game_id
+
+    def get_loaded(self, game_id: int) -> GameState | None:
+        return self.states.get(game_id)
+
+    async def get_by_chat_id(self, chat_id: int) -> GameState | None:
+        game_id = self._chat_games.get(chat_id)
+        if game_id is not None:
+            return self.states[game_id]
+        game = await self.app.store.games.get_game_by_chat_id(chat_id=chat_id)
+        if not game:
+            return None
+        return await self.get(game.id)
+
+    async def unload(self, game_id: int) -> None:
+        await self.flush(game_id=game_id)
+        state = self.states.pop(game_id, None)
+        if state:
+            self._chat_games.pop(state.chat_id, None)
+
+    async def _load(self, game_id: int) -> GameState | None:
+        state = await self.app.store.games.get_game_board(game_id=game_id)
+        if not state:
+            return None
+        self.add(state)
+        return state
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                self.logger.exception("game state flush failed", exc_info=e)
+
+    async def flush(self, game_id: int | None = None) -> None:
+        async with self._flush_lock:
+            await self._flush(game_id=game_id)
+
+    async def _flush(self, game_id: int | None) -> None:
+        if game_id is None:
+            states = [state for state in self.states.values() if state.is_dirty]
+        else:
+            state = self.states.get(game_id)
+            states = [state] if state and state.is_dirty else []
+        if not states:
+            return
+
+        changes = [(state, state.take_changes()) for state in states]
+        try:
+            applied = await self.app.store.games.apply_trades(
+                {
+                    key: delta
+                    for _, trades in changes
+                    for key, delta in trades.items()
+                }
+            )
+        except Exception:
+            for state, trades in changes:
+                state.restore_changes(trades)
+            raise
+        for state, trades in changes:
+            if any(player_id not in applied for player_id, _ in trades):
+                await self._reload(state)
+
+    async def _reload(self, state: GameState) -> None:
+        # The db refused a batch the board allowed, so the db wins for the
+        # trades this flush took; later ones are replayed on the fresh board
+        self.logger.warning(
+            "game %s diverged from db, reloading", state.game_id
+        )
+        fresh = await self.app.store.games.get_game_board(game_id=state.game_id)
+        if not fresh:
+            return
+        for (player_id, share_id), (
+            quantity,
+            cash,
+        ) in state.pending_trades.items():
+            player = fresh.players.get(player_id)
+            if player is None:
+                continue
+            player.balance += cash
+            holding = player.holdings.get(share_id, 0) + quantity
+            if holding:
+                player.holdings[share_id] = holding
+            else:
+                player.holdings.pop(share_id, None)
+        state.players = fresh.players
@@ -1,4 +1,13 @@
+import asyncio
 import os
+from collections.abc import AsyncIterator, Callable
+from contextlib import (
+    AbstractAsyncContextManager,
+    asynccontextmanager,
+    nullcontext,
+)
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Any
 
 from sqlalchemy import URL
@@ -11,35 +20,138 @@ from sqlalchemy.ext.asyncio import (
 from sqlalchemy.orm import DeclarativeBase
 
 from app.store.database import BaseModel
+from app.store.database.pool import InstrumentedPool
 
 if TYPE_CHECKING:
     from app.web.app import Application
 
 
+class UnitOfWorkSession(AsyncSession):
+    async def commit(self) -> None:
+        # Accessors commit their own steps, the unit of work commits once
+        await self.flush()
+
+
+@dataclass(slots=True)
+class UnitOfWork:
+    session: UnitOfWorkSession
+    task: asyncio.Task | None
+    on_commit: list[Callable[[], None]] = field(default_factory=list)
+
+
+_unit_of_work: ContextVar[UnitOfWork | None] = ContextVar(
+    "unit_of_work", default=None
+)
+
+
+def _current_unit_of_work() -> UnitOfWork | None:
+    uow = _unit_of_work.get()
+    # Tasks spawned inside a unit of work inherit the contextvar,
+    # but must not share its session
+    if uow and uow.task is asyncio.current_task():
+        return uow
+    return None
+
+
 class Database:
     def __init__(self, app: "Application") -> None:
         self.app = app
         self.engine: AsyncEngine | None = None
         self._db: type[DeclarativeBase] = BaseModel
-        self.session: async_sessionmaker[AsyncSession] | None = None
+        self.sessionmaker: async_sessionmaker[AsyncSession] | None = None
+        self._uow_sessionmaker: async_sessionmaker[UnitOfWorkSession] | None = (
+            None
+        )
 
     async def connect(self, *args: Any, **kwargs: Any) -> None:
+        config = self.app.config.database
         self.engine = create_async_engine(
             URL.create(
                 drivername="postgresql+asyncpg",
-                username=os.getenv(self.app.config.database.user),
-                password=os.getenv(self.app.config.database.password),
-                host=os.getenv(self.app.config.database.host),
-                database=os.getenv(self.app.config.database.database),
-                port=int(os.getenv(self.app.config.database.port)),
+                username=os.getenv(config.user),
+                password=os.getenv(config.password),
+                host=os.getenv(config.host),
+                database=os.getenv(config.database),
+                port=int(os.getenv(config.port)),
             ),
+            poolclass=InstrumentedPool,
+            pool_size=config.pool_size,
+            max_overflow=config.max_overflow,
+            pool_timeout=config.pool_timeout,
+            pool_recycle=config.pool_recycle,
+            pool_pre_ping=config.pool_pre_ping,
+            connect_args={
+                # asyncpg prepares through the adapter, which keeps its own
+                # cache and bypasses the driver's statement_cache_size
+                "prepared_statement_cache_size": (
+                    config.prepared_statement_cache_size
+                ),
+                "server_settings": {
+                    "statement_timeout": str(config.statement_timeout),
+                    "application_name": config.application_name,
+                },
+            },
         )
-        self.session = async_sessionmaker(
+        self.sessionmaker = async_sessionmaker(
             self.engine,
             expire_on_commit=False,
             class_=AsyncSession,
         )
+        self._uow_sessionmaker = async_sessionmaker(
+            self.engine,
+            expire_on_commit=False,
+            class_=UnitOfWorkSession,
+        )
+
+    def session(
+        self, join: bool = True
+    ) -> AbstractAsyncContextManager[AsyncSession]:
+        uow = _current_unit_of_work() if join else None
+        if uow:
+            return nullcontext(uow.session)
+        return self.sessionmaker()
+
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator[AsyncSession]:
+        uow = _current_unit_of_work()
+        if uow:
+            yield uow.session
+            return
+        async with self._uow_sessionmaker() as session:
+            uow = UnitOfWork(session=session, task=asyncio.current_task())
+            token = _unit_of_work.set(uow)
+            try:
+                yield session
+                await AsyncSession.commit(session)
+            finally:
+                _unit_of_work.reset(token)
+        for callback in uow.on_commit:
+            callback()
+
+    async def checkpoint(self) -> None:
+        # Commits the unit of work so far, so no transaction and no pooled
+        # connection is held across a slow network await
+        uow = _current_unit_of_work()
+        if uow is None:
+            return
+        await AsyncSession.commit(uow.session)
+        callbacks, uow.on_commit = uow.on_commit, []
+        for callback in callbacks:
+            callback()
+
+    def on_commit(self, callback: Callable[[], None]) -> None:
+        # Caches must not learn about rows a unit of work may still roll back
+        uow = _current_unit_of_work()
+        if uow:
+            uow.on_commit.append(callback)
+        else:
+            callback()
 
     async def disconnect(self, *args: Any, **kwargs: Any) -> None:
         if self.engine:
             await self.engine.dispose()
+
+    def stats(self) -> dict:
+        if not self.engine:
+            return {}
+        return self.engine.pool.stats()
@@ -0,0 +1,58 @@
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float) -> None:
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    metrics: PoolMetrics
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self) -> "InstrumentedPool":
+        # engine.dispose() swaps the pool, the counters survive it
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started_at = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.record(time.perf_counter() - started_at)
+        return entry
+
+    def stats(self) -> dict:
+        metrics = self.metrics
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": self.overflow(),
+            "checkouts": metrics.checkouts,
+            "timeouts": metrics.timeouts,
+            "avg_checkout_wait": (
+                metrics.total_wait / metrics.checkouts
+                if metrics.checkouts
+                else 0.0
+            ),
+            "max_checkout_wait": metrics.max_wait,
+        }
@@ -10,18 +10,22 @@ class Store:
     def __init__(self, app: "Application", *args, **kwargs):
         from app.game.accessor import GameAccessor
         from app.game.game_settings_accessor import GameSettingsAccessor
+        from app.game.state_accessor import GameStateAccessor
         from app.telegram.accessor import TelegramAPIAccessor
         from app.users.accessor import UserAccessor
 
         self.app = app
         self.user = UserAccessor(app)
+        self.settings = GameSettingsAccessor(app)
         self.telegram_api = TelegramAPIAccessor(app)
         self.games = GameAccessor(app)
-        self.settings = GameSettingsAccessor(app)
+        self.game_states = GameStateAccessor(app)
 
 
 def setup_store(app: "Application"):
     app.database = Database(app)
     app.on_startup.append(app.database.connect)
-    app.on_cleanup.append(app.database.disconnect)
     app.store = Store(app)
+    # Cleanup runs in registration order: accessors flush before the engine
+    # is disposed
+    app.on_cleanup.append(app.database.disconnect)
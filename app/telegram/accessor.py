@@ -6,8 +6,13 @@ from aiohttp.client import ClientSession
 from sqlalchemy import select
 
 from app.base.base_accessor import BaseAccessor
+from app.telegram.bot import Bot
+from app.telegram.coalescer import EditCoalescer
+from app.telegram.dispatcher import Dispatcher
 from app.telegram.models import PollModel
 from app.telegram.poller import Poller
+from app.telegram.sender import OutboundSender, Priority
+from app.web.utils import dumps
 
 if typing.TYPE_CHECKING:
     from app.web.app import Application
@@ -18,6 +23,10 @@ class TelegramAPIAccessor(BaseAccessor):
         super().__init__(app, *args, **kwargs)
         self.session: ClientSession | None = None
         self.poller: Poller | None = None
+        self.bot: Bot | None = None
+        self.dispatcher: Dispatcher | None = None
+        self.sender: OutboundSender | None = None
+        self.edits: EditCoalescer | None = None
         self.message: str | None = None
         self.tg_api: str = (
             f"https://api.telegram.org/bot{os.getenv(app.config.bot.token)}"
@@ -25,16 +34,58 @@ class TelegramAPIAccessor(BaseAccessor):
 
     async def connect(self, app: "Application"):
         self.session = ClientSession(connector=TCPConnector(verify_ssl=False))
+        self.sender = OutboundSender(
+            send_request=self.send_request,
+            logger=self.logger,
+            global_rate=app.config.bot.global_rate_limit,
+            chat_rate=app.config.bot.chat_rate_limit,
+            chat_burst=app.config.bot.chat_burst,
+            max_attempts=app.config.bot.max_send_attempts,
+        )
+        self.sender.start()
+        self.edits = EditCoalescer(
+            send_edit=self.edit_game_message,
+            logger=self.logger,
+            interval=app.config.bot.edit_interval,
+        )
+        self.bot = Bot(app.store)
+        self.dispatcher = Dispatcher(
+            handler=self.handle_update,
+            logger=self.logger,
+            mailbox_size=app.config.bot.mailbox_size,
+            max_concurrency=app.config.bot.max_concurrency,
+        )
+        if app.config.bot.mode == "webhook":
+            await self.set_webhook()
+            self.logger.info("receiving updates via webhook")
+            return
+        await self.delete_webhook()
         self.poller = Poller(app.store)
         self.logger.info("start polling")
         self.poller.start()
 
     async def disconnect(self, app: "Application"):
+        if self.poller:
+            await self.poller.stop()
+
+        if self.dispatcher:
+            await self.dispatcher.stop()
+
+        if self.bot:
+            await self.bot.turns.stop()
+
+        if self.edits:
+            await self.edits.stop()
+
+        if self.sender:
+            await self.sender.stop()
+
         if self.session:
             await self.session.close()
 
-        if self.poller:
-            await self.poller.stop()
+    async def handle_update(self, update: dict) -> None:
+        async with self.app.database.unit_of_work():
+            await self.bot.parse_message(update)
 
     @staticmethod
     def _build_query(host: str, method: str):
@@ -53,22 +104,75 @@ class TelegramAPIAccessor(BaseAccessor):
             params=params,
         ) as response:
             data = await response.json()
-            self.logger.info(data)
+            self.logger.debug(data)
             return data
 
-    async def send_answer_callback_query(self, callback_query_id: int):
+    async def send_request(self, method: str, payload: dict) -> dict:
         async with self.session.post(
-            self._build_query(host=self.tg_api, method="answerCallbackQuery"),
+            self._build_query(host=self.tg_api, method=method),
+            data=self._encode_payload(payload),
+            headers={"Content-Type": "application/json"},
+        ) as response:
+            return await response.json()
+
+    @staticmethod
+    def _encode_payload(payload: dict) -> bytes:
+        markup = payload.get("reply_markup")
+        if not isinstance(markup, bytes):
+            return dumps(payload)
+        # Keyboards come pre-serialized, so they are spliced in as raw JSON
+        rest = {
+            key: value
+            for key, value in payload.items()
+            if key != "reply_markup"
+        }
+        body = dumps(rest)
+        separator = b"," if rest else b""
+        return body[:-1] + separator + b'"reply_markup":' + markup + b"}"
+
+    async def _send(
+        self,
+        method: str,
+        payload: dict,
+        priority: Priority,
+        chat_id: int | None = None,
+    ) -> dict:
+        # The sender may hold a request for seconds (rate limits, retries)
+        await self.app.database.checkpoint()
+        return await self.sender.submit(
+            method=method, payload=payload, priority=priority, chat_id=chat_id
+        )
+
+    async def set_webhook(self):
+        bot_config = self.app.config.bot
+        async with self.session.post(
+            self._build_query(host=self.tg_api, method="setWebhook"),
             json={
-                "callback_query_id": callback_query_id,
+                "url": os.getenv(bot_config.webhook_url),
+                "secret_token": os.getenv(bot_config.webhook_secret),
             },
         ) as response:
             return await response.json()
 
-    async def send_start_poll(self, chat_id: int, game_id: int):
+    async def delete_webhook(self):
         async with self.session.post(
-            self._build_query(host=self.tg_api, method="sendpoll"),
-            json={
+            self._build_query(host=self.tg_api, method="deleteWebhook"),
+        ) as response:
+            return await response.json()
+
+    async def send_answer_callback_query(self, callback_query_id: int):
+        return await self._send(
+            method="answerCallbackQuery",
+            payload={
+                "callback_query_id": callback_query_id,
+            },
+            priority=Priority.callback,
+        )
+
+    async def send_start_poll(self, chat_id: int):
+        return await self._send(
+            method="sendpoll",
+            payload={
                 "chat_id": chat_id,
                 "question": "Кто будет принимать участие в игре?",
                 "options": [
@@ -80,20 +184,18 @@ class TelegramAPIAccessor(BaseAccessor):
                 "type": "regular",
                 "open_period": 60,
             },
-        ) as response:
-            result = await response.json()
-            poll_id = result["result"]["poll"]["id"]
-            await self.create_poll(poll_id=poll_id, game_id=game_id)
-            return result
+            priority=Priority.info,
+            chat_id=chat_id,
+        )
 
     async def get_poll_results(self, poll_id: str):
-        async with self.session.post(
-            self._build_query(host=self.tg_api, method="pollanswer"),
-            json={
+        return await self._send(
+            method="pollanswer",
+            payload={
                 "poll_id": poll_id,
             },
-        ) as response:
-            return await response.json()
+            priority=Priority.info,
+        )
 
     async def create_poll(self, poll_id: str, game_id: int):
         async with self.app.database.session() as session:
@@ -111,52 +213,56 @@ class TelegramAPIAccessor(BaseAccessor):
             return await session.scalar(stmt)
 
     async def send_admin_panel_message(self, chat_id: int, text: str, keyboard):
-        async with self.session.post(
-            self._build_query(host=self.tg_api, method="sendMessage"),
-            json={
+        return await self._send(
+            method="sendMessage",
+            payload={
                 "chat_id": chat_id,
                 "text": text,
                 "parse_mode": "Markdown",
                 "reply_markup": keyboard,
             },
-        ) as response:
-            return await response.json()
+            priority=Priority.info,
+            chat_id=chat_id,
+        )
 
     async def send_basic_message(self, chat_id: int, text: str):
-        async with self.session.post(
-            self._build_query(host=self.tg_api, method="sendMessage"),
-            json={
+        return await self._send(
+            method="sendMessage",
+            payload={
                 "chat_id": chat_id,
                 "text": text,
             },
-        ) as response:
-            return await response.json()
+            priority=Priority.info,
+            chat_id=chat_id,
+        )
 
     async def send_info_message_to_chat(
         self, chat_id: int, text: str, keyboard
     ):
-        async with self.session.post(
-            self._build_query(host=self.tg_api, method="sendMessage"),
-            json={
+        return await self._send(
+            method="sendMessage",
+            payload={
                 "chat_id": chat_id,
                 "text": text,
                 "parse_mode": "Markdown",
                 "reply_markup": keyboard,
             },
-        ) as response:
-            return await response.json()
+            priority=Priority.info,
+            chat_id=chat_id,
+        )
 
     async def send_game_message(self, chat_id: int, text: str, keyboard):
-        async with self.session.post(
-            self._build_query(host=self.tg_api, method="sendMessage"),
-            json={
+        return await self._send(
+            method="sendMessage",
+            payload={
                 "chat_id": chat_id,
                 "text": text,
                 "parse_mode": "Markdown",
                 "reply_markup": keyboard,
             },
-        ) as response:
-            return await response.json()
+            priority=Priority.board,
+            chat_id=chat_id,
+        )
 
     async def edit_game_message(
         self,
@@ -165,14 +271,15 @@ class TelegramAPIAccessor(BaseAccessor):
         text: str,
         keyboard,
     ):
-        async with self.session.post(
-            self._build_query(host=self.tg_api, method="editMessageText"),
-            json={
+        return await self._send(
+            method="editMessageText",
+            payload={
                 "chat_id": chat_id,
                 "message_id": message_id,
                 "text": text,
                 "parse_mode": "Markdown",
                 "reply_markup": keyboard,
             },
-        ) as response:
-            return await response.json()
+            priority=Priority.board,
+            chat_id=chat_id,
+        )
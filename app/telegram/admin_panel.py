@@ -112,15 +112,12 @@ class AdminPanel:
             await self.main_menu(chat_id=chat_id)
 
     async def main_menu(self, chat_id: int):
-        turn_timer = await self.store.settings.get_turn_timer()
-        turn_counter = await self.store.settings.get_turn_counter()
-        player_balance = await self.store.settings.get_player_balance()
-        share_minimal_price = (
-            await self.store.settings.get_shares_minimal_price()
-        )
-        share_maximum_price = (
-            await self.store.settings.get_shares_maximum_price()
-        )
+        settings = self.store.settings.snapshot
+        turn_timer = settings.turn_timer
+        turn_counter = settings.turn_counter
+        player_balance = settings.player_balance
+        share_minimal_price = settings.shares_minimal_price
+        share_maximum_price = settings.shares_maximum_price
         shares = await self.store.games.get_shares()
         message = f"""Текущие настройки:
 Таймер хода: {turn_timer} секунд
@@ -1,9 +1,9 @@
 import asyncio
-import random
 from asyncio import Queue
-from typing import Any
 
-from app.game.models import PlayerModel
+from app.game.game_settings_accessor import GameSettings
+from app.game.scheduler import TurnScheduler
+from app.game.state import GameState, PlayerStanding, PlayerState
 from app.store import Store
 from app.telegram.admin_panel import AdminPanel
 from app.telegram.keyboard import (
@@ -11,38 +11,31 @@ from app.telegram.keyboard import (
     info_keyboard_generator,
 )
 from app.telegram.messages import BotCommands, MessageType, TextMessage
+from app.users.models import UserModel
 
 
 class Bot:
     def __init__(self, store: Store):
         self.store = store
-        self.player_balance: int | None = None
-        self.turn_timer: int | None = None
-        self.turn_counter: int | None = None
-        self.minimal_shares_price: int | None = None
-        self.maximum_shares_price: int | None = None
-        self.settings = asyncio.create_task(self.setup_settings())
         self.queue = Queue()
+        self.turns = TurnScheduler(
+            on_deadline=self.on_turn_deadline, logger=store.app.logger
+        )
+        self.turns.start()
         self.work = asyncio.create_task(self.worker())
         self.check_games = asyncio.create_task(self.check_unfinished_games())
         self.admin_panel = AdminPanel(store)
         self.skip_players: dict[int, set] = {}
 
-    async def setup_settings(self):
-        while True:
-            self.turn_timer = await self.store.settings.get_turn_timer()
-            self.player_balance = await self.store.settings.get_player_balance()
-            self.turn_counter = await self.store.settings.get_turn_counter()
-            self.minimal_shares_price = (
-                await self.store.settings.get_shares_minimal_price()
-            )
-            self.maximum_shares_price = (
-                await self.store.settings.get_shares_maximum_price()
-            )
+    @property
+    def settings(self) -> GameSettings:
+        return self.store.settings.snapshot
 
     async def check_unfinished_games(self):
         games = await self.store.games.get_all_active_games()
         for game in games:
+            # Rebuild the in-memory state from what was flushed before restart
+            state = await self.store.game_states.get(game.id)
             await self.queue.put(
                 asyncio.create_task(
                     self.store.telegram_api.send_basic_message(
@@ -51,9 +44,7 @@ class Bot:
                     )
                 )
             )
-            task = asyncio.create_task(
-                self.game_turn_controller(game_id=game.id)
-            )
+            await self.play_turn(state)
 
     async def worker(self):
         while True:
@@ -66,30 +57,21 @@ class Bot:
         )
         if game_exists and game_exists.is_active:
             return
-        game = await self.store.games.create_game(chat_id)
-        await self.store.games.increase_game_turn(game_id=game.id)
-        await self.queue.put(
-            asyncio.create_task(
-                self.store.telegram_api.send_start_poll(
-                    chat_id=chat_id, game_id=game.id
-                )
-            )
+        poll = await self.store.telegram_api.send_start_poll(chat_id=chat_id)
+        if not poll.get("ok"):
+            return
+        state = await self.store.games.create_game_with_inventory(
+            chat_id=chat_id, poll_id=poll["result"]["poll"]["id"]
         )
-        shares = await self.store.games.get_shares()
-        for share in shares:
-            await self.store.games.add_share_to_inventory(
-                share_id=share.id,
-                game_id=game.id,
-                share_price=share.start_price,
-            )
+        self.store.game_states.add(state)
 
     async def start_game(self, chat_id: int):
-        game = await self.store.games.get_game_by_chat_id(chat_id=chat_id)
-        if not game or game.last_turn > 1:
+        state = await self.store.game_states.get_by_chat_id(chat_id=chat_id)
+        if not state or state.turn > 1:
             return
-        players = await self.store.games.get_alive_players(game_id=game.id)
-        if len(players) < 2:
-            await self.store.games.finish_game(game_id=game.id)
+        if len(state.alive_players()) < 2:
+            await self.store.games.finish_game(game_id=state.game_id)
+            await self.store.game_states.unload(game_id=state.game_id)
             await self.queue.put(
                 asyncio.create_task(
                     self.send_message_to_telegram(
@@ -101,28 +83,52 @@ class Bot:
                 )
             )
             return
-        task = asyncio.create_task(self.game_turn_controller(game_id=game.id))
+        if not self.turns.is_scheduled(state.game_id):
+            await self.play_turn(state)
 
-    async def create_player(self, user_id: int, game_id: int):
+    async def create_player(self, user: UserModel, game_id: int):
         player = await self.store.games.get_player_by_user_and_game_id(
-            user_id=user_id, game_id=game_id
+            user_id=user.id, game_id=game_id
         )
         if not player:
-            await self.store.games.create_player(
-                user_id=user_id,
+            player = await self.store.games.create_player(
+                user_id=user.id,
                 game_id=game_id,
-                balance=self.player_balance,
+                balance=self.settings.player_balance,
             )
+            state = self.store.game_states.get_loaded(game_id=game_id)
+            if state:
+                state.add_player(
+                    PlayerState(
+                        id=player.id,
+                        user_id=user.id,
+                        telegram_id=user.telegram_id,
+                        first_name=user.first_name,
+                        nickname=user.nickname,
+                        balance=player.balance,
+                    )
+                )
 
-    async def change_shares_price(self, game_id: int):
-        shares = await self.store.games.get_game_inventory(game_id)
-        for share in shares:
-            new_price = random.randint(
-                self.minimal_shares_price, self.maximum_shares_price
-            )
-            await self.store.games.change_item_price(
-                game_id, share.share_id, new_price
-            )
+    async def change_shares_price(self, state: GameState):
+        prices = await self.store.games.reprice_shares(
+            game_id=state.game_id,
+            turn=state.turn,
+            price_seed=state.price_seed,
+            prices={
+                share_id: share.price
+                for share_id, share in state.shares.items()
+            },
+            price_model=self.settings.price_model,
+            minimal_price=self.settings.shares_minimal_price,
+            maximum_price=self.settings.shares_maximum_price,
+        )
+        state.set_prices(prices)
+
+    async def next_turn(self, state: GameState):
+        self.skip_players.pop(state.game_id, None)
+        await self.change_shares_price(state)
+        await self.store.games.increase_game_turn(game_id=state.game_id)
+        state.turn += 1
 
     async def finish_game(
         self,
@@ -131,8 +137,8 @@ class Bot:
         chat_id: int | None = None,
     ):
         if game_id is None:
-            game = await self.store.games.get_game_by_chat_id(chat_id=chat_id)
-            if not game:
+            state = await self.store.game_states.get_by_chat_id(chat_id=chat_id)
+            if not state:
                 await self.queue.put(
                     asyncio.create_task(
                         self.send_message_to_telegram(
@@ -144,66 +150,52 @@ class Bot:
                     )
                 )
                 return
-            game_id = game.id
+        else:
+            state = await self.store.game_states.get(game_id=game_id)
         if user_id:
-            user = await self.store.user.get_user_by_telegram_id(
-                telegram_id=user_id
-            )
-            player = await self.store.games.get_player_by_user_and_game_id(
-                user_id=user.id, game_id=game_id
-            )
+            player = state.get_player_by_telegram_id(telegram_id=user_id)
             # Game over protection
             if not player:
                 return
-        winner, player_results = await self.calculate_results(game_id=game_id)
-        user = await self.store.user.get_user_by_id(winner["player"])
-        message = f"""Поздравляем победителя в нашей игре {user.first_name} (@{user.nickname})! Финальное состояние {winner['total_value']}.\n\
-Результаты остальных участников: \n\
-{'\n'.join([f'{(await self.store.user.get_user_by_id(obj[0])).first_name}\
- (@{(await self.store.user.get_user_by_id(obj[0])).nickname}), Баланс: {obj[1]}' for obj in player_results.items()])}                   
-                   """
-        await self.store.games.finish_game(game_id=game_id)
-        chat_id = (await self.store.games.get_game_by_id(game_id)).chat_id
+        self.turns.cancel(state.game_id)
+        self.skip_players.pop(state.game_id, None)
+        # Pending trades must reach the db before it ranks the players
+        await self.store.game_states.flush(game_id=state.game_id)
+        standings = await self.store.games.compute_standings(
+            game_id=state.game_id
+        )
+        message = self.make_results_message(standings)
+        await self.store.games.finish_game(
+            game_id=state.game_id, save_results=True
+        )
+        await self.store.game_states.unload(game_id=state.game_id)
+        self.store.telegram_api.edits.discard(chat_id=state.chat_id)
         await self.queue.put(
             asyncio.create_task(
                 self.send_message_to_telegram(
                     message_type="info",
-                    chat_id=chat_id,
+                    chat_id=state.chat_id,
                     text=message,
                     keyboard=info_keyboard_generator(),
                 )
             )
         )
 
-    async def calculate_results(
-        self, game_id: int
-    ) -> tuple[dict[str, int | None | Any], dict[Any, Any]]:
-        result = {}
-        players = await self.store.games.get_all_players(game_id=game_id)
-        maximum_value = 0
-        winner = None
-        for player in players:
-            player_value = 0
-            player_value += await self.store.games.get_player_balance(player.id)
-            player_shares = await self.store.games.get_player_inventory(
-                player.id
-            )
-            for share in player_shares:
-                player_value += (
-                    await self.store.games.get_game_inventory_item_by_share_id(
-                        game_id=game_id, share_id=share.share_id
-                    )
-                ).price
-            result[player.user_id] = player_value
-            if player_value > maximum_value:
-                maximum_value = player_value
-                winner = player
-        del result[winner.user_id]
-        winner_result = {
-            "player": winner.user_id,
-            "total_value": maximum_value,
-        }
-        return winner_result, result
+    @staticmethod
+    def make_results_message(standings: list[PlayerStanding]) -> str:
+        if not standings:
+            return "Игра завершена"
+        winner, *rest = standings
+        results = "\n".join(
+            f"{standing.rank}. {standing.first_name} (@{standing.nickname}), "
+            f"Баланс: {standing.total_value}"
+            for standing in rest
+        )
+        return (
+            f"Поздравляем победителя в нашей игре {winner.first_name} "
+            f"(@{winner.nickname})! Финальное состояние {winner.total_value}.\n"
+            f"Результаты остальных участников: \n{results}"
+        )
 
     async def start_bot(self, chat_id: int):
         game = await self.store.games.get_game_by_chat_id(chat_id=chat_id)
@@ -262,204 +254,97 @@ class Bot:
         return user
 
     async def player_left_the_game(self, telegram_id: int, chat_id: int):
-        game = await self.store.games.get_game_by_chat_id(chat_id=chat_id)
-        if not game:
+        state = await self.store.game_states.get_by_chat_id(chat_id=chat_id)
+        if not state:
             return
-        user = await self.store.user.get_user_by_telegram_id(
-            telegram_id=telegram_id
-        )
-        player = await self.store.games.get_player_by_user_and_game_id(
-            user_id=user.id, game_id=game.id
-        )
+        player = state.get_player_by_telegram_id(telegram_id=telegram_id)
         if player:
+            player.alive = False
             await self.store.games.player_dead(player_id=player.id)
 
-    async def game_turn_controller(self, game_id: int):
-        while True:
-            game = await self.store.games.get_game_by_id(game_id=game_id)
-            players_count = len(
-                await self.store.games.get_alive_players(game_id=game_id)
-            )
-            if not game.is_active:
-                break
-            game_last_turn = game.last_turn
-            if game_last_turn < self.turn_counter + 1 and players_count >= 2:
-                game_inventory = await self.store.games.get_game_inventory(
-                    game_id=game_id
-                )
-                formatted_game_inventory = [
-                    [
-                        (
-                            await self.store.games.get_share_by_id(
-                                item.share_id
-                            )
-                        ).name,
-                        item.share_id,
-                        item.price,
-                    ]
-                    for item in game_inventory
-                ]
-                await self.queue.put(
-                    asyncio.create_task(
-                        self.send_message_to_telegram(
-                            message_type="new_game_message",
-                            chat_id=(
-                                await self.store.games.get_game_by_id(
-                                    game_id=game_id
-                                )
-                            ).chat_id,
-                            text=await self.make_game_message(
-                                game_id=game_id,
-                                game_inventory=formatted_game_inventory,
-                            ),
-                            keyboard=game_keyboard_generator(
-                                formatted_game_inventory
-                            ),
-                        )
+    async def play_turn(self, state: GameState):
+        if (
+            state.turn < self.settings.turn_counter + 1
+            and len(state.alive_players()) >= 2
+        ):
+            await self.queue.put(
+                asyncio.create_task(
+                    self.send_message_to_telegram(
+                        message_type="new_game_message",
+                        chat_id=state.chat_id,
+                        text=self.make_game_message(state),
+                        keyboard=game_keyboard_generator(state.inventory()),
                     )
                 )
-                await asyncio.sleep(self.turn_timer)
-                game_after_sleep = await self.store.games.get_game_by_id(
-                    game_id=game_id
-                )
-                if game_last_turn == game_after_sleep.last_turn:
-                    await self.change_shares_price(game_id=game_id)
-                    await self.store.games.increase_game_turn(game_id=game_id)
-                else:
-                    break
-            else:
-                await self.finish_game(game_id=game_id)
-                break
+            )
+            self.turns.schedule(
+                game_id=state.game_id, delay=self.settings.turn_timer
+            )
+        else:
+            await self.finish_game(game_id=state.game_id)
 
-    async def make_game_message(self, game_id: int, game_inventory):
-        alive_players = await self.store.games.get_alive_players(
-            game_id=game_id
-        )
-        players_info = await self.get_players_info(alive_players)
-        game = await self.store.games.get_game_by_id(game_id=game_id)
+    async def on_turn_deadline(self, game_id: int):
+        state = self.store.game_states.get_loaded(game_id=game_id)
+        if not state:
+            return
+        async with self.store.app.database.unit_of_work():
+            await self.next_turn(state)
+            await self.play_turn(state)
+
+    def make_game_message(self, state: GameState) -> str:
         return f"""
-Представляю вашему вниманию состояние фондового рынка на текущий ход ({game.last_turn}):
-{'\n'.join([f'{item[0]}, {item[2]}' for item in game_inventory])}
+Представляю вашему вниманию состояние фондового рынка на текущий ход ({state.turn}):
+{'\n'.join([f'{item[0]}, {item[2]}' for item in state.inventory()])}
 Список игроков:
 {'\n'.join([
-f'{(await self.store.user.get_user_by_id(player.user_id)).first_name} '
-f'(@{(await self.store.user.get_user_by_id(player.user_id)).nickname})'
+f'{player.first_name} '
+f'(@{player.nickname})'
 f' Баланс: {player.balance} Инвентарь: {' '.join([
-                        f'{x[0]}({x[1]})' for x in players_info[player.id]
+                        f'{state.shares[share_id].name}({count})'
+                        for share_id, count in sorted(player.holdings.items())
                     ])}'
-            for player in alive_players])}
+            for player in state.alive_players()])}
                 """
 
     async def player_buys(
         self, user_id: int, chat_id: int, share_id: int, message_id: int
     ):
-        user = await self.store.user.get_user_by_telegram_id(
-            telegram_id=user_id
-        )
-        game = await self.store.games.get_game_by_chat_id(chat_id=chat_id)
-        if not all([user, game]):
+        state = await self.store.game_states.get_by_chat_id(chat_id=chat_id)
+        if not state:
             return
-        player = await self.store.games.get_player_by_user_and_game_id(
-            user_id=user.id, game_id=game.id
-        )
-        game_item = await self.store.games.get_game_inventory_item_by_share_id(
-            game_id=game.id, share_id=share_id
-        )
-        if player.balance >= game_item.price:
-            await self.store.games.add_share_to_player_inventory(
-                player_id=player.id,
-                share_id=share_id,
+        if state.buy(telegram_id=user_id, share_id=share_id):
+            await self.send_edit_game_message(
+                state=state, message_id=message_id
             )
-        game_id = player.game_id
-        await self.send_edit_game_message(
-            game_id=game_id, chat_id=chat_id, message_id=message_id
-        )
 
     async def player_sells(
         self, user_id: int, chat_id: int, share_id: int, message_id: int
     ):
-        user = await self.store.user.get_user_by_telegram_id(
-            telegram_id=user_id
-        )
-        game = await self.store.games.get_game_by_chat_id(chat_id=chat_id)
-        if not all([user, game]):
+        state = await self.store.game_states.get_by_chat_id(chat_id=chat_id)
+        if not state:
             return
-        player = await self.store.games.get_player_by_user_and_game_id(
-            user_id=user.id, game_id=game.id
-        )
-        player_shares = await self.store.games.get_player_shares(
-            player_id=player.id
-        )
-        if not list(filter(lambda x: x.id == share_id, player_shares)):
-            return
-        await self.store.games.remove_share_from_player_inventory(
-            player_id=player.id,
-            share_id=share_id,
-        )
-        game_id = player.game_id
-        await self.send_edit_game_message(
-            game_id=game_id, chat_id=chat_id, message_id=message_id
-        )
-
-    async def send_edit_game_message(
-        self, game_id: int, chat_id: int, message_id: int
-    ):
-        game_inventory = await self.store.games.get_game_inventory(
-            game_id=game_id
-        )
-        formatted_game_inventory = [
-            [
-                (await self.store.games.get_share_by_id(item.share_id)).name,
-                item.share_id,
-                item.price,
-            ]
-            for item in game_inventory
-        ]
-        await self.queue.put(
-            asyncio.create_task(
-                self.send_message_to_telegram(
-                    message_type="edit_game_message",
-                    chat_id=chat_id,
-                    message_id=message_id,
-                    text=await self.make_game_message(
-                        game_id, formatted_game_inventory
-                    ),
-                    keyboard=game_keyboard_generator(formatted_game_inventory),
-                )
+        if state.sell(telegram_id=user_id, share_id=share_id):
+            await self.send_edit_game_message(
+                state=state, message_id=message_id
             )
-        )
 
-    async def get_players_info(
-        self, players: list[PlayerModel]
-    ) -> dict[int, list[list]]:
-        result = {}
-        for player in players:
-            player_shares = [
-                [
-                    item.name,
-                    await self.store.games.get_count_of_items(
-                        item.id, player.id
-                    ),
-                ]
-                for item in (
-                    await self.store.games.get_player_shares(
-                        player_id=player.id
-                    )
-                )
-            ]
-            result[player.id] = player_shares
-        return result
+    async def send_edit_game_message(self, state: GameState, message_id: int):
+        # Rendered at flush time, so a burst of trades becomes one edit
+        self.store.telegram_api.edits.schedule(
+            chat_id=state.chat_id,
+            message_id=message_id,
+            render=lambda: (
+                self.make_game_message(state),
+                game_keyboard_generator(state.inventory()),
+            ),
+        )
 
     async def parse_message(self, item):
         if item.get("message"):
             if item["message"]["chat"]["type"] == "private":
-                await self.queue.put(
-                    asyncio.create_task(
-                        self.admin_panel.check_private_message(
-                            message=item["message"]["text"],
-                            telegram_id=item["message"]["chat"]["id"],
-                        )
-                    )
+                await self.admin_panel.check_private_message(
+                    message=item["message"]["text"],
+                    telegram_id=item["message"]["chat"]["id"],
                 )
                 return
             if item["message"].get("text"):
@@ -487,20 +372,14 @@ f' Баланс: {player.balance} Инвентарь: {' '.join([
                     )
                 ).game_id
                 await self.create_player(
-                    user_id=user.id,
+                    user=user,
                     game_id=game_id,
                 )
         elif item.get("callback_query"):
             if item["callback_query"]["message"]["chat"]["type"] == "private":
-                await self.queue.put(
-                    asyncio.create_task(
-                        self.admin_panel.check_private_message(
-                            message=item,
-                            telegram_id=item["callback_query"]["message"][
-                                "chat"
-                            ]["id"],
-                        )
-                    )
+                await self.admin_panel.check_private_message(
+                    message=item,
+                    telegram_id=item["callback_query"]["message"]["chat"]["id"],
                 )
             else:
                 await self.check_message(
@@ -559,16 +438,17 @@ f' Баланс: {player.balance} Инвентарь: {' '.join([
                 chat_id=chat_id, telegram_id=args[0]
             )
         elif message == BotCommands.skip_turn.value:
-            game = await self.store.games.get_game_by_chat_id(chat_id=chat_id)
+            state = await self.store.game_states.get_by_chat_id(chat_id=chat_id)
+            if not state:
+                return
             try:
-                self.skip_players[game.id].add(args[0])
+                self.skip_players[state.game_id].add(args[0])
             except KeyError:
-                self.skip_players[game.id] = set()
-                self.skip_players[game.id].add(args[0])
-            alive_players = await self.store.games.get_alive_players(
-                game_id=game.id
-            )
-            if len(alive_players) == len(self.skip_players[game.id]):
+                self.skip_players[state.game_id] = set()
+                self.skip_players[state.game_id].add(args[0])
+            if len(state.alive_players()) == len(
+                self.skip_players[state.game_id]
+            ) and self.turns.reschedule(game_id=state.game_id, delay=0):
                 await self.queue.put(
                     asyncio.create_task(
                         self.store.telegram_api.send_basic_message(
@@ -577,12 +457,7 @@ f' Баланс: {player.balance} Инвентарь: {' '.join([
                         )
                     )
                 )
-                self.skip_players[game.id].clear()
-                await self.change_shares_price(game_id=game.id)
-                await self.store.games.increase_game_turn(game_id=game.id)
-                await self.queue.put(
-                    asyncio.create_task(self.game_turn_controller(game.id))
-                )
+                self.skip_players[state.game_id].clear()
 
         elif complex_callback_message[0] == "купить":
             await self.player_buys(
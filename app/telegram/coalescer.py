@@ -0,0 +1,91 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from logging import Logger
+
+EditKey = tuple[int, int]
+
+
+class EditCoalescer:
+    def __init__(
+        self,
+        send_edit: Callable[[int, int, str, str], Awaitable[dict]],
+        logger: Logger,
+        interval: float,
+    ) -> None:
+        self.send_edit = send_edit
+        self.logger = logger
+        self.interval = interval
+        # Only the latest render per message survives until the next flush
+        self._pending: dict[EditKey, Callable[[], tuple[str, str]]] = {}
+        self._flushers: dict[EditKey, asyncio.Task] = {}
+        self._last_sent: dict[EditKey, tuple[str, str]] = {}
+        self._last_flush_at: dict[EditKey, float] = {}
+        self.requested = 0
+        self.coalesced = 0
+        self.unchanged = 0
+        self.sent = 0
+
+    def schedule(
+        self,
+        chat_id: int,
+        message_id: int,
+        render: Callable[[], tuple[str, str]],
+    ) -> None:
+        key = (chat_id, message_id)
+        self.requested += 1
+        if key in self._pending:
+            self.coalesced += 1
+        self._pending[key] = render
+        if key not in self._flushers:
+            self._flushers[key] = asyncio.create_task(self._flush(key))
+
+    def discard(self, chat_id: int) -> None:
+        for key in [key for key in self._last_sent if key[0] == chat_id]:
+            del self._last_sent[key]
+            self._last_flush_at.pop(key, None)
+        for key in [key for key in self._pending if key[0] == chat_id]:
+            del self._pending[key]
+
+    async def stop(self) -> None:
+        flushers = list(self._flushers.values())
+        for flusher in flushers:
+            flusher.cancel()
+        await asyncio.gather(*flushers, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "requested": self.requested,
+            "coalesced": self.coalesced,
+            "unchanged": self.unchanged,
+            "sent": self.sent,
+        }
+
+    async def _flush(self, key: EditKey) -> None:
+        try:
+            while key in self._pending:
+                wait = (
+                    self._last_flush_at.get(key, 0)
+                    + self.interval
+                    - time.monotonic()
+                )
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    if key not in self._pending:
+                        break
+                text, keyboard = self._pending.pop(key)()
+                self._last_flush_at[key] = time.monotonic()
+                if self._last_sent.get(key) == (text, keyboard):
+                    self.unchanged += 1
+                    continue
+                self.sent += 1
+                try:
+                    await self.send_edit(*key, text, keyboard)
+                except Exception as e:
+                    self.logger.exception("board edit failed", exc_info=e)
+                else:
+                    # A failed edit leaves the old board, so it must be retried
+                    self._last_sent[key] = (text, keyboard)
+        finally:
+            del self._flushers[key]
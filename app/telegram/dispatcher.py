@@ -0,0 +1,103 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from logging import Logger
+
+IDLE_TIMEOUT = 30
+
+
+class Dispatcher:
+    def __init__(
+        self,
+        handler: Callable[[dict], Awaitable[None]],
+        logger: Logger,
+        mailbox_size: int,
+        max_concurrency: int,
+    ) -> None:
+        self.handler = handler
+        self.logger = logger
+        self.mailbox_size = mailbox_size
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._mailboxes: dict[Hashable, asyncio.Queue[dict]] = {}
+        self._consumers: dict[Hashable, asyncio.Task] = {}
+        self._in_flight = 0
+        self.processed = 0
+        self.failed = 0
+
+    @staticmethod
+    def get_chat_key(update: dict) -> Hashable:
+        if update.get("message"):
+            return update["message"]["chat"]["id"]
+        if update.get("callback_query"):
+            message = update["callback_query"].get("message")
+            if message:
+                return message["chat"]["id"]
+            return ("user", update["callback_query"]["from"]["id"])
+        # Poll updates carry no chat, but every poll belongs to one game
+        if update.get("poll_answer"):
+            return ("poll", update["poll_answer"]["poll_id"])
+        if update.get("poll"):
+            return ("poll", update["poll"]["id"])
+        return ("update", update.get("update_id"))
+
+    async def dispatch(self, update: dict) -> None:
+        await self._get_mailbox(update).put(update)
+
+    def dispatch_nowait(self, update: dict) -> bool:
+        mailbox = self._get_mailbox(update)
+        if mailbox.full():
+            return False
+        mailbox.put_nowait(update)
+        return True
+
+    def _get_mailbox(self, update: dict) -> asyncio.Queue[dict]:
+        key = self.get_chat_key(update)
+        mailbox = self._mailboxes.get(key)
+        if mailbox is None:
+            mailbox = asyncio.Queue(maxsize=self.mailbox_size)
+            self._mailboxes[key] = mailbox
+            self._consumers[key] = asyncio.create_task(
+                self._consume(key, mailbox)
+            )
+        return mailbox
+
+    async def stop(self) -> None:
+        consumers = list(self._consumers.values())
+        for consumer in consumers:
+            consumer.cancel()
+        await asyncio.gather(*consumers, return_exceptions=True)
+
+    def stats(self) -> dict:
+        depths = [mailbox.qsize() for mailbox in self._mailboxes.values()]
+        return {
+            "active_chats": len(self._mailboxes),
+            "queued_updates": sum(depths),
+            "max_mailbox_depth": max(depths, default=0),
+            "mailbox_size": self.mailbox_size,
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+    async def _consume(self, key: Hashable, mailbox: asyncio.Queue) -> None:
+        while True:
+            try:
+                update = await asyncio.wait_for(mailbox.get(), IDLE_TIMEOUT)
+            except TimeoutError:
+                if mailbox.empty():
+                    del self._mailboxes[key]
+                    del self._consumers[key]
+                    return
+                continue
+            async with self._semaphore:
+                self._in_flight += 1
+                try:
+                    await self.handler(update)
+                except Exception as e:
+                    self.failed += 1
+                    self.logger.exception("update handling failed", exc_info=e)
+                else:
+                    self.processed += 1
+                finally:
+                    self._in_flight -= 1
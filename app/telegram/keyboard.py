@@ -1,171 +1,147 @@
-import json
+from functools import lru_cache
 
+from app.web.utils import dumps
 
-def game_keyboard_generator(data: list) -> str:
-    shares_buttons = [
+OPTION_BUTTONS = [
+    [
+        {
+            "text": "Покинуть игру",
+            "callback_data": "Покинуть игру",
+        },
+    ],
+    [
+        {
+            "text": "Завершить игру",
+            "callback_data": "Завершить игру",
+        },
+    ],
+    [
+        {
+            "text": "Пропустить ход",
+            "callback_data": "Пропустить ход",
+        }
+    ],
+]
+
+
+def dump_keyboard(buttons: list) -> bytes:
+    # Already JSON, spliced into request bodies as is
+    return dumps({"inline_keyboard": buttons})
+
+
+def setting_buttons(setting_type: str, values: range) -> list:
+    return [
+        [{"text": f"{num}", "callback_data": f"{setting_type} {num}"}]
+        for num in values
+    ]
+
+
+INFO_KEYBOARD = dump_keyboard(
+    [
+        [
+            {"text": "Привет биржа", "callback_data": "Привет биржа"},
+        ],
+        [
+            {"text": "Правила игры", "callback_data": "Правила игры"},
+        ],
+        [
+            {"text": "О боте", "callback_data": "О боте"},
+        ],
         [
             {
-                "text": f"{item[0]} купить",
-                "callback_data": f"купить {item[1]}",
-            },
+                "text": "Создать игру",
+                "callback_data": "Кто будет играть?",
+            }
+        ],
+        [{"text": "Начать игру", "callback_data": "Начать игру"}],
+    ]
+)
+
+ADMIN_KEYBOARDS = {
+    "turn_timer": dump_keyboard(
+        setting_buttons("turn_timer", range(15, 91, 15))
+    ),
+    "turn_counter": dump_keyboard(
+        setting_buttons("turn_counter", range(2, 11, 2))
+    ),
+    "player_balance": dump_keyboard(
+        setting_buttons("player_balance", range(500, 2501, 500))
+    ),
+    "share_minimal_price": dump_keyboard(
+        setting_buttons("share_minimal_price", range(0, 2, 1))
+    ),
+    "share_maximum_price": dump_keyboard(
+        setting_buttons("share_maximum_price", range(500, 2501, 500))
+    ),
+}
+
+MAIN_ADMIN_KEYBOARD = dump_keyboard(
+    [
+        [
             {
-                "text": f"{item[0]} продать",
-                "callback_data": f"продать {item[1]}",
+                "text": "Изменить максимальное количество ходов",
+                "callback_data": "turn_counter",
             },
-        ]
-        for item in data
-    ]
-    option_buttons = [
+        ],
         [
             {
-                "text": "Покинуть игру",
-                "callback_data": "Покинуть игру",
+                "text": "Изменить время хода",
+                "callback_data": "turn_timer",
             },
         ],
         [
             {
-                "text": "Завершить игру",
-                "callback_data": "Завершить игру",
+                "text": "Изменить стартовый баланс игроков",
+                "callback_data": "player_balance",
             },
         ],
         [
             {
-                "text": "Пропустить ход",
-                "callback_data": "Пропустить ход",
+                "text": "Изменить минимальную стоимость акции",
+                "callback_data": "share_minimal_price",
+            }
+        ],
+        [
+            {
+                "text": "Изменить максимальную стоимость акции",
+                "callback_data": "share_maximum_price",
             }
         ],
     ]
-    buttons = shares_buttons + option_buttons
-    return json.dumps(
-        {
-            "inline_keyboard": buttons,
-        }
-    )
-
-
-def info_keyboard_generator() -> str:
-    return json.dumps(
-        {
-            "inline_keyboard": [
-                [
-                    {"text": "Привет биржа", "callback_data": "Привет биржа"},
-                ],
-                [
-                    {"text": "Правила игры", "callback_data": "Правила игры"},
-                ],
-                [
-                    {"text": "О боте", "callback_data": "О боте"},
-                ],
-                [
-                    {
-                        "text": "Создать игру",
-                        "callback_data": "Кто будет играть?",
-                    }
-                ],
-                [{"text": "Начать игру", "callback_data": "Начать игру"}],
-            ]
-        }
-    )
+)
 
 
-def get_admin_keyboard(setting_type: str) -> str | None:
-    if setting_type == "turn_timer":
-        return json.dumps(
-            {
-                "inline_keyboard": [
-                    [{"text": f"{num}", "callback_data": f"turn_timer {num}"}]
-                    for num in range(15, 91, 15)
-                ]
-            }
-        )
-    elif setting_type == "turn_counter":
-        return json.dumps(
-            {
-                "inline_keyboard": [
-                    [{"text": f"{num}", "callback_data": f"turn_counter {num}"}]
-                    for num in range(2, 11, 2)
-                ]
-            }
-        )
-    elif setting_type == "player_balance":
-        return json.dumps(
-            {
-                "inline_keyboard": [
-                    [
-                        {
-                            "text": f"{num}",
-                            "callback_data": f"player_balance {num}",
-                        }
-                    ]
-                    for num in range(500, 2501, 500)
-                ]
-            }
-        )
-    elif setting_type == "share_minimal_price":
-        return json.dumps(
+@lru_cache(maxsize=256)
+def _game_keyboard(shares: tuple[tuple[int, str], ...]) -> bytes:
+    shares_buttons = [
+        [
             {
-                "inline_keyboard": [
-                    [
-                        {
-                            "text": f"{num}",
-                            "callback_data": f"share_minimal_price {num}",
-                        }
-                    ]
-                    for num in range(0, 2, 1)
-                ]
-            }
-        )
-    elif setting_type == "share_maximum_price":
-        return json.dumps(
+                "text": f"{name} купить",
+                "callback_data": f"купить {share_id}",
+            },
             {
-                "inline_keyboard": [
-                    [
-                        {
-                            "text": f"{num}",
-                            "callback_data": f"share_maximum_price {num}",
-                        }
-                    ]
-                    for num in range(500, 2501, 500)
-                ]
-            }
-        )
-    return None
+                "text": f"{name} продать",
+                "callback_data": f"продать {share_id}",
+            },
+        ]
+        for share_id, name in shares
+    ]
+    return dump_keyboard(shares_buttons + OPTION_BUTTONS)
 
 
-def get_main_admin_keyboard() -> str:
-    return json.dumps(
-        {
-            "inline_keyboard": [
-                [
-                    {
-                        "text": "Изменить максимальное количество ходов",
-                        "callback_data": "turn_counter",
-                    },
-                ],
-                [
-                    {
-                        "text": "Изменить время хода",
-                        "callback_data": "turn_timer",
-                    },
-                ],
-                [
-                    {
-                        "text": "Изменить стартовый баланс игроков",
-                        "callback_data": "player_balance",
-                    },
-                ],
-                [
-                    {
-                        "text": "Изменить минимальную стоимость акции",
-                        "callback_data": "share_minimal_price",
-                    }
-                ],
-                [
-                    {
-                        "text": "Изменить максимальную стоимость акции",
-                        "callback_data": "share_maximum_price",
-                    }
-                ],
-            ]
-        }
-    )
+def game_keyboard_generator(data: list) -> bytes:
+    # Prices are not on the buttons, so the board keyboard only depends
+    # on which shares are in the game
+    return _game_keyboard(tuple((item[1], item[0]) for item in data))
+
+
+def info_keyboard_generator() -> bytes:
+    return INFO_KEYBOARD
+
+
+def get_admin_keyboard(setting_type: str) -> bytes | None:
+    return ADMIN_KEYBOARDS.get(setting_type)
+
+
+def get_main_admin_keyboard() -> bytes:
+    return MAIN_ADMIN_KEYBOARD
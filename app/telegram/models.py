@@ -8,5 +8,5 @@ class PollModel(BaseModel):
     __tablename__ = "polls"
     poll_id: Mapped[str] = mapped_column(primary_key=True, nullable=False)
     game_id: Mapped[int] = mapped_column(
-        BigInteger, ForeignKey("games.id"), nullable=False
+        BigInteger, ForeignKey("games.id"), nullable=False, index=True
     )
@@ -2,7 +2,6 @@ import asyncio
 from asyncio import Future, Task
 
 from app.store import Store
-from app.telegram.bot import Bot
 
 
 class Poller:
@@ -10,8 +9,6 @@ class Poller:
         self.store = store
         self.is_running = False
         self.poll_task: Task | None = None
-        self.bot: Bot | None = None
-        self.queue: asyncio.Queue[Task] | None = None
 
     def _done_callback(self, result: Future) -> None:
         if result.exception():
@@ -22,8 +19,6 @@ class Poller:
             self.start()
 
     def start(self) -> None:
-        self.bot = Bot(self.store)
-        self.queue = self.bot.queue
         self.is_running = True
         self.poll_task = asyncio.create_task(self.poll())
         self.poll_task.add_done_callback(self._done_callback)
@@ -39,7 +34,5 @@ class Poller:
                 offset=offset, timeout=5
             )
             for item in message["result"]:
-                await self.queue.put(
-                    asyncio.create_task(self.bot.parse_message(item))
-                )
+                await self.store.telegram_api.dispatcher.dispatch(item)
                 offset = item["update_id"] + 1
@@ -0,0 +1,12 @@
+import typing
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+from app.telegram.views import WebhookView
+
+WEBHOOK_PATH = "/telegram/webhook"
+
+
+def setup_routes(app: "Application"):
+    app.router.add_view(WEBHOOK_PATH, WebhookView)
@@ -0,0 +1,250 @@
+import asyncio
+import heapq
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from enum import IntEnum
+from logging import Logger
+
+RETRY_JITTER = 0.5
+THROUGHPUT_WINDOW = 60
+# An idle bucket has long refilled, dropping it loses nothing
+BUCKET_IDLE_TIMEOUT = 60
+
+
+class RateLimitExceededError(Exception):
+    pass
+
+
+class Priority(IntEnum):
+    callback = 0
+    board = 1
+    info = 2
+
+
+@dataclass(order=True, slots=True)
+class OutboundRequest:
+    priority: int
+    seq: int
+    method: str = field(compare=False)
+    payload: dict = field(compare=False)
+    chat_id: int | None = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def delay(self, now: float) -> float:
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+
+class OutboundSender:
+    def __init__(
+        self,
+        send_request: Callable[[str, dict], Awaitable[dict]],
+        logger: Logger,
+        global_rate: float,
+        chat_rate: float,
+        chat_burst: int,
+        max_attempts: int,
+    ) -> None:
+        self.send_request = send_request
+        self.logger = logger
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_attempts = max_attempts
+        self._global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        self._buckets_swept_at = time.monotonic()
+        self._queue: list[OutboundRequest] = []
+        self._wakeup = asyncio.Event()
+        self._seq = 0
+        self._delayed = 0
+        self._in_flight: set[asyncio.Task] = set()
+        self._worker: asyncio.Task | None = None
+        self._sent_at: deque[float] = deque()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.total_queue_latency = 0.0
+        self.max_queue_latency = 0.0
+
+    def start(self) -> None:
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        in_flight = list(self._in_flight)
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        for request in self._queue:
+            request.future.cancel()
+        self._queue.clear()
+
+    def submit(
+        self,
+        method: str,
+        payload: dict,
+        priority: Priority,
+        chat_id: int | None = None,
+    ) -> asyncio.Future:
+        self._seq += 1
+        request = OutboundRequest(
+            priority=priority,
+            seq=self._seq,
+            method=method,
+            payload=payload,
+            chat_id=chat_id,
+            future=asyncio.get_running_loop().create_future(),
+            enqueued_at=time.monotonic(),
+        )
+        self._push(request)
+        return request.future
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        self._trim_sent(now)
+        return {
+            "queued": len(self._queue),
+            "delayed": self._delayed,
+            "in_flight": len(self._in_flight),
+            "chat_buckets": len(self._chat_buckets),
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "sent_per_second": len(self._sent_at) / THROUGHPUT_WINDOW,
+            "avg_queue_latency": (
+                self.total_queue_latency / self.sent if self.sent else 0.0
+            ),
+            "max_queue_latency": self.max_queue_latency,
+        }
+
+    def _push(self, request: OutboundRequest) -> None:
+        heapq.heappush(self._queue, request)
+        self._wakeup.set()
+
+    def _push_later(self, delay: float, request: OutboundRequest) -> None:
+        self._delayed += 1
+
+        def push() -> None:
+            self._delayed -= 1
+            self._push(request)
+
+        asyncio.get_running_loop().call_later(delay, push)
+
+    def _chat_bucket(self, chat_id: int | None) -> TokenBucket | None:
+        if chat_id is None:
+            return None
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _evict_idle_buckets(self, now: float) -> None:
+        if now - self._buckets_swept_at < BUCKET_IDLE_TIMEOUT:
+            return
+        self._buckets_swept_at = now
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            if (
+                now - bucket.updated_at > BUCKET_IDLE_TIMEOUT
+                and bucket.blocked_until <= now
+            ):
+                del self._chat_buckets[chat_id]
+
+    async def _run(self) -> None:
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            self._evict_idle_buckets(now)
+            global_delay = self._global_bucket.delay(now)
+            if global_delay > 0:
+                await asyncio.sleep(global_delay)
+                continue
+            request = heapq.heappop(self._queue)
+            chat_bucket = self._chat_bucket(request.chat_id)
+            chat_delay = chat_bucket.delay(now) if chat_bucket else 0
+            if chat_delay > 0:
+                self._push_later(chat_delay, request)
+                continue
+            self._global_bucket.consume()
+            if chat_bucket:
+                chat_bucket.consume()
+            task = asyncio.create_task(self._send(request))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, request: OutboundRequest) -> None:
+        request.attempts += 1
+        try:
+            response = await self.send_request(request.method, request.payload)
+        except Exception as e:
+            if request.attempts < self.max_attempts:
+                self._retry(request, 2**request.attempts)
+                return
+            self.failed += 1
+            self.logger.exception("telegram request failed", exc_info=e)
+            request.future.set_exception(e)
+            return
+
+        if response.get("error_code") == 429:
+            retry_after = response.get("parameters", {}).get("retry_after", 1)
+            bucket = self._chat_bucket(request.chat_id) or self._global_bucket
+            bucket.blocked_until = time.monotonic() + retry_after
+            if request.attempts < self.max_attempts:
+                self._retry(request, retry_after)
+                return
+            self.failed += 1
+            self.logger.error(
+                "telegram request %s rate limited %s times",
+                request.method,
+                request.attempts,
+            )
+            if not request.future.done():
+                request.future.set_exception(
+                    RateLimitExceededError(response.get("description"))
+                )
+            return
+
+        now = time.monotonic()
+        latency = now - request.enqueued_at
+        self.sent += 1
+        self.total_queue_latency += latency
+        self.max_queue_latency = max(self.max_queue_latency, latency)
+        self._sent_at.append(now)
+        self._trim_sent(now)
+        if not request.future.done():
+            request.future.set_result(response)
+
+    def _retry(self, request: OutboundRequest, delay: float) -> None:
+        self.retried += 1
+        self._push_later(delay + random.uniform(0, RETRY_JITTER), request)
+
+    def _trim_sent(self, now: float) -> None:
+        while self._sent_at and self._sent_at[0] < now - THROUGHPUT_WINDOW:
+            self._sent_at.popleft()
@@ -0,0 +1,32 @@
+import hmac
+import os
+
+from aiohttp.web_exceptions import HTTPForbidden, HTTPTooManyRequests
+from aiohttp_apispec import docs
+
+from app.web.mixins import View
+from app.web.utils import json_response
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookView(View):
+    @docs(
+        tags=["telegram"],
+        summary="Telegram webhook",
+        description="Accept updates pushed by Telegram in webhook mode",
+    )
+    async def post(self):
+        bot_config = self.request.app.config.bot
+        secret = os.getenv(bot_config.webhook_secret or "")
+        token = self.request.headers.get(SECRET_TOKEN_HEADER, "")
+        if bot_config.mode != "webhook" or not secret:
+            raise HTTPForbidden
+        if not hmac.compare_digest(token, secret):
+            raise HTTPForbidden
+
+        update = await self.request.json()
+        # Telegram redelivers the update later if the chat is overloaded
+        if not self.store.telegram_api.dispatcher.dispatch_nowait(update):
+            raise HTTPTooManyRequests
+        return json_response()
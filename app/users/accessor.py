@@ -7,13 +7,30 @@ from app.web.app import Application
 if typing.TYPE_CHECKING:
     from app.web.app import Application
 
-from sqlalchemy import and_, select
+from sqlalchemy import select
 
 from app.base.base_accessor import BaseAccessor
+from app.base.cache import TTLCache
 from app.users.models import UserModel
 
+USER_CACHE_SIZE = 10_000
+USER_CACHE_TTL = 300
+
 
 class UserAccessor(BaseAccessor):
+    def __init__(self, app: "Application", *args, **kwargs) -> None:
+        super().__init__(app, *args, **kwargs)
+        # Keyed by ("id", id) and ("telegram_id", telegram_id). Users are
+        # never changed after creation, so entries only need to expire
+        self.cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+    def _cache_user(self, user: UserModel) -> None:
+        def put() -> None:
+            self.cache.put(("id", user.id), user)
+            self.cache.put(("telegram_id", user.telegram_id), user)
+
+        self.app.database.on_commit(put)
+
     async def connect(self, app: "Application"):
         config_admin = self.app.config.admin
         admin = await self.get_admin_by_telegram_id(
@@ -38,21 +55,34 @@ class UserAccessor(BaseAccessor):
             )
             session.add(user)
             await session.commit()
+        self._cache_user(user)
         return user
 
     async def get_user_by_id(self, id: int) -> UserModel | None:
+        user = self.cache.get(("id", id))
+        if user:
+            return user
         stmt = select(UserModel).where(UserModel.id == id)
         async with self.app.database.session() as session:
             user = await session.scalar(stmt)
-        return user if user else None
+        if not user:
+            return None
+        self._cache_user(user)
+        return user
 
     async def get_user_by_telegram_id(
         self, telegram_id: int
     ) -> UserModel | None:
+        user = self.cache.get(("telegram_id", telegram_id))
+        if user:
+            return user
         stmt = select(UserModel).where(UserModel.telegram_id == telegram_id)
         async with self.app.database.session() as session:
             user = await session.scalar(stmt)
-        return user if user else None
+        if not user:
+            return None
+        self._cache_user(user)
+        return user
 
     async def create_admin(
         self, telegram_id: int, nickname: str, first_name: str, password: str
@@ -68,43 +98,37 @@ class UserAccessor(BaseAccessor):
             )
             session.add(user)
             await session.commit()
+        self._cache_user(user)
+        return user
 
     async def get_admin_by_telegram_id(
         self, telegram_id: int
     ) -> UserModel | None:
-        stmt = select(UserModel).where(
-            and_(
-                UserModel.telegram_id == telegram_id,
-                UserModel.is_admin,
-            )
-        )
-        async with self.app.database.session() as session:
-            user = await session.scalar(stmt)
-        return user if user else None
+        user = await self.get_user_by_telegram_id(telegram_id=telegram_id)
+        return user if user and user.is_admin else None
 
     async def is_admin(self, telegram_id: int) -> bool:
-        stmt = select(UserModel).where(
-            and_(
-                UserModel.telegram_id == telegram_id,
-                UserModel.is_admin,
-            )
+        return bool(
+            await self.get_admin_by_telegram_id(telegram_id=telegram_id)
         )
-        async with self.app.database.session() as session:
-            user = await session.scalar(stmt)
-        return bool(user)
 
     async def check_admin(self, telegram_id: int, password: str) -> bool:
-        stmt = select(UserModel).where(
-            and_(
-                UserModel.telegram_id == telegram_id,
-                UserModel.is_admin,
-            )
-        )
-        async with self.app.database.session() as session:
-            user = await session.scalar(stmt)
+        user = await self.get_admin_by_telegram_id(telegram_id=telegram_id)
+        if not user:
+            return False
         return sha256(password.encode()).hexdigest() == user.password
 
-    async def get_users_list(self) -> list[UserModel]:
-        stmt = select(UserModel).order_by(UserModel.id)
+    async def get_users_list(
+        self,
+        limit: int,
+        after: int | None = None,
+        is_admin: bool | None = None,
+    ) -> list[UserModel]:
+        # Keyset page: walks the primary key instead of counting an offset
+        stmt = select(UserModel).order_by(UserModel.id).limit(limit)
+        if after is not None:
+            stmt = stmt.where(UserModel.id > after)
+        if is_admin is not None:
+            stmt = stmt.where(UserModel.is_admin == is_admin)
         async with self.app.database.session() as session:
             return list(await session.scalars(stmt))
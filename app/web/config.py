@@ -25,6 +25,16 @@ class AdminConfig:
 @dataclass
 class BotConfig:
     token: str
+    mode: str = "polling"
+    webhook_url: str | None = None
+    webhook_secret: str | None = None
+    mailbox_size: int = 100
+    max_concurrency: int = 50
+    global_rate_limit: float = 30
+    chat_rate_limit: float = 1
+    chat_burst: int = 3
+    max_send_attempts: int = 5
+    edit_interval: float = 1
 
 
 @dataclass
@@ -34,6 +44,15 @@ class DatabaseConfig:
     user: str
     password: str
     database: str
+    pool_size: int = 10
+    max_overflow: int = 10
+    pool_timeout: float = 30
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    prepared_statement_cache_size: int = 100
+    # milliseconds, 0 disables the limit
+    statement_timeout: int = 5000
+    application_name: str = "exchange_bot"
 
 
 @dataclass
@@ -58,8 +77,6 @@ def setup_config(app: "Application", config_path: str):
             nickname=raw_config["admin"]["nickname"],
             first_name=raw_config["admin"]["first_name"],
         ),
-        bot=BotConfig(
-            token=raw_config["bot"]["token"],
-        ),
+        bot=BotConfig(**raw_config["bot"]),
         database=DatabaseConfig(**raw_config["database"]),
     )
@@ -1,9 +1,11 @@
 from aiohttp.web_app import Application
 
 from app.admin.routes import setup_routes as admin_setup_routes
+from app.telegram.routes import setup_routes as telegram_setup_routes
 
 __all__ = ("setup_routes",)
 
 
 def setup_routes(application: Application):
     admin_setup_routes(application)
+    telegram_setup_routes(application)
@@ -1,9 +1,47 @@
-from aiohttp.web import json_response as aiohttp_json_response
+import datetime
+import json
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any
+
 from aiohttp.web_response import Response
+from marshmallow import Schema, fields
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime.date | datetime.time):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+
+    def dumps(data: Any) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+else:
+
+    def dumps(data: Any) -> bytes:
+        return json.dumps(
+            data, ensure_ascii=False, separators=(",", ":"), default=_default
+        ).encode()
+
+
+def _json_body_response(data: dict, http_status: int = 200) -> Response:
+    return Response(
+        body=dumps(data),
+        status=http_status,
+        content_type="application/json",
+        charset="utf-8",
+    )
 
 
 def json_response(data: dict | None = None, status: str = "ok") -> Response:
-    return aiohttp_json_response(
+    return _json_body_response(
         data={
             "status": status,
             "data": data or {},
@@ -17,11 +55,59 @@ def error_json_response(
     message: str | None = None,
     data: dict | None = None,
 ):
-    return aiohttp_json_response(
-        status=http_status,
+    return _json_body_response(
+        http_status=http_status,
         data={
             "status": status,
             "message": str(message),
             "data": data or {},
         },
     )
+
+
+def next_after(rows: list, limit: int) -> int | None:
+    # A short page is the last one, a full page may have a successor
+    if len(rows) < limit:
+        return None
+    return rows[-1].id
+
+
+_MISSING = object()
+_FIELD_CONVERTERS: dict[type, Callable[[Any], Any]] = {
+    fields.Integer: int,
+    fields.String: str,
+    fields.Boolean: bool,
+    fields.DateTime: datetime.datetime.isoformat,
+}
+
+
+def compile_dump(schema: Schema) -> Callable[[Iterable], list[dict]]:
+    # Flat schemas of plain fields skip marshmallow's per-field dispatch,
+    # anything else keeps the regular dump
+    plan = []
+    for name, field in schema.dump_fields.items():
+        convert = _FIELD_CONVERTERS.get(type(field))
+        if convert is None or (
+            isinstance(field, fields.DateTime)
+            and field.format not in (None, "iso", "iso8601")
+        ):
+            return lambda objects: schema.dump(objects, many=True)
+        plan.append((field.data_key or name, field.attribute or name, convert))
+
+    def dump(objects: Iterable) -> list[dict]:
+        result = []
+        for obj in objects:
+            if isinstance(obj, Mapping):
+                # marshmallow reads mappings by key, keep its behaviour
+                result.append(schema.dump(obj))
+                continue
+            item = {}
+            for key, attribute, convert in plan:
+                value = getattr(obj, attribute, _MISSING)
+                if value is _MISSING:
+                    continue
+                item[key] = None if value is None else convert(value)
+            result.append(item)
+        return result
+
+    return dump
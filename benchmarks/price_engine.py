@@ -0,0 +1,34 @@
+import sys
+import time
+
+from app.game.price_engine import PRICE_MODELS
+
+GAMES = 10_000
+SHARES = 10
+TURNS = 5
+MINIMAL_PRICE = 1
+MAXIMUM_PRICE = 500
+
+
+def run() -> None:
+    prices = [[100 + share for share in range(SHARES)] for _ in range(GAMES)]
+    for name, model in PRICE_MODELS.items():
+        board = prices
+        started_at = time.perf_counter()
+        for turn in range(TURNS):
+            board = model.step(
+                prices=board,
+                seeds=[f"{game_id}:{turn}" for game_id in range(GAMES)],
+                minimal_price=MINIMAL_PRICE,
+                maximum_price=MAXIMUM_PRICE,
+            )
+        per_turn = (time.perf_counter() - started_at) / TURNS
+        sys.stdout.write(
+            f"{name:<15} {GAMES} games x {SHARES} shares: "
+            f"{per_turn * 1000:.1f} ms per turn, "
+            f"{per_turn / GAMES * 1e6:.1f} us per game\n"
+        )
+
+
+if __name__ == "__main__":
+    run()
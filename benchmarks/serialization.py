@@ -0,0 +1,83 @@
+import datetime
+import json
+import sys
+import time
+
+from app.admin.schemes import (
+    GameListSchema,
+    UserListSchema,
+    dump_games,
+    dump_users,
+)
+from app.game.models import GameModel
+from app.users.models import UserModel
+from app.web.utils import dumps, orjson
+
+ROWS = 50_000
+ROUNDS = 3
+
+
+def make_users() -> list[UserModel]:
+    users = []
+    for user_id in range(ROWS):
+        user = UserModel(
+            telegram_id=100_000_000 + user_id,
+            nickname=f"user_{user_id}",
+            first_name="Игрок",
+            is_admin=user_id % 100 == 0,
+        )
+        user.id = user_id
+        users.append(user)
+    return users
+
+
+def make_games() -> list[GameModel]:
+    started_at = datetime.datetime(2024, 5, 1)
+    games = []
+    for game_id in range(ROWS):
+        game = GameModel(
+            chat_id=-1_000_000 - game_id % 500,
+            started_at=started_at,
+            finish_at=started_at + datetime.timedelta(minutes=15),
+            is_active=False,
+        )
+        game.id = game_id
+        games.append(game)
+    return games
+
+
+def measure(name: str, serialize) -> None:
+    started_at = time.perf_counter()
+    for _ in range(ROUNDS):
+        body = serialize()
+    elapsed = (time.perf_counter() - started_at) / ROUNDS
+    sys.stdout.write(
+        f"{name:<32} {elapsed * 1000:8.1f} ms, "
+        f"{ROWS / elapsed / 1000:7.1f}k rows/s, {len(body) / 2**20:.1f} MiB\n"
+    )
+
+
+def run() -> None:
+    users = make_users()
+    games = make_games()
+    sys.stdout.write(
+        f"{ROWS} rows, serializer: {'orjson' if orjson else 'json'}\n"
+    )
+    measure(
+        "users: marshmallow + json",
+        lambda: json.dumps(UserListSchema().dump({"users": users})).encode(),
+    )
+    measure(
+        "users: compiled + dumps", lambda: dumps({"users": dump_users(users)})
+    )
+    measure(
+        "games: marshmallow + json",
+        lambda: json.dumps(GameListSchema().dump({"games": games})).encode(),
+    )
+    measure(
+        "games: compiled + dumps", lambda: dumps({"games": dump_games(games)})
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+
+import pytest
+
+from app.telegram.coalescer import EditCoalescer
+
+INTERVAL = 0.05
+
+
+@pytest.fixture
+def edits():
+    return []
+
+
+@pytest.fixture
+async def coalescer(edits):
+    async def send_edit(chat_id, message_id, text, keyboard):
+        await asyncio.sleep(0)
+        edits.append((chat_id, message_id, text))
+        return {"ok": True}
+
+    coalescer = EditCoalescer(
+        send_edit=send_edit,
+        logger=logging.getLogger("test"),
+        interval=INTERVAL,
+    )
+    yield coalescer
+    await coalescer.stop()
+
+
+def render(text):
+    return lambda: (text, "keyboard")
+
+
+async def test_burst_is_coalesced_to_the_latest_render(coalescer, edits):
+    coalescer.schedule(1, 10, render("first"))
+    await asyncio.sleep(0.01)
+    for turn in range(5):
+        coalescer.schedule(1, 10, render(f"update {turn}"))
+    await asyncio.sleep(INTERVAL * 2)
+
+    assert edits == [(1, 10, "first"), (1, 10, "update 4")]
+    assert coalescer.stats()["coalesced"] == 4
+
+
+async def test_unchanged_render_is_skipped(coalescer, edits):
+    coalescer.schedule(1, 10, render("board"))
+    await asyncio.sleep(0.01)
+    coalescer.schedule(1, 10, render("board"))
+    await asyncio.sleep(INTERVAL * 2)
+
+    assert edits == [(1, 10, "board")]
+    assert coalescer.stats()["unchanged"] == 1
+
+
+async def test_messages_are_flushed_independently(coalescer, edits):
+    coalescer.schedule(1, 10, render("a"))
+    coalescer.schedule(2, 20, render("b"))
+    await asyncio.sleep(0.01)
+
+    assert sorted(edits) == [(1, 10, "a"), (2, 20, "b")]
+
+
+async def test_discarded_chat_drops_pending_edits(coalescer, edits):
+    coalescer.schedule(1, 10, render("first"))
+    await asyncio.sleep(0.01)
+    coalescer.schedule(1, 10, render("stale"))
+    coalescer.discard(chat_id=1)
+    await asyncio.sleep(INTERVAL * 2)
+
+    assert edits == [(1, 10, "first")]
+    assert coalescer.stats()["pending"] == 0
+
+
+async def test_failed_edit_is_retried_with_the_same_render(edits):
+    failures = [ConnectionError("network down")]
+
+    async def send_edit(chat_id, message_id, text, keyboard):
+        await asyncio.sleep(0)
+        if failures:
+            raise failures.pop()
+        edits.append((chat_id, message_id, text))
+        return {"ok": True}
+
+    coalescer = EditCoalescer(
+        send_edit=send_edit,
+        logger=logging.getLogger("test"),
+        interval=INTERVAL,
+    )
+    coalescer.schedule(1, 10, render("board"))
+    await asyncio.sleep(0.01)
+    coalescer.schedule(1, 10, render("board"))
+    await asyncio.sleep(INTERVAL * 2)
+    await coalescer.stop()
+
+    assert edits == [(1, 10, "board")]
+    assert coalescer.stats()["unchanged"] == 0
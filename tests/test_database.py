@@ -0,0 +1,54 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from app.store.database.database import Database
+from app.web.config import DatabaseConfig
+
+
+class ConnectAbortedError(Exception):
+    pass
+
+
+async def fake_asyncpg_connect(*args, **kwargs):
+    await asyncio.sleep(0)
+    return SimpleNamespace()
+
+
+@pytest.fixture
+def database(monkeypatch):
+    monkeypatch.setenv("TEST_DB_HOST", "localhost")
+    monkeypatch.setenv("TEST_DB_PORT", "5432")
+    config = DatabaseConfig(
+        host="TEST_DB_HOST",
+        port="TEST_DB_PORT",
+        user="TEST_DB_USER",
+        password="TEST_DB_PASSWORD",
+        database="TEST_DB_NAME",
+        prepared_statement_cache_size=7,
+    )
+    app = SimpleNamespace(config=SimpleNamespace(database=config))
+    return Database(app)
+
+
+async def test_adapter_uses_configured_statement_cache_size(database):
+    await database.connect()
+    adapted = []
+
+    @event.listens_for(database.engine.sync_engine, "do_connect")
+    def build_adapter(dialect, conn_rec, cargs, cparams):
+        adapted.append(
+            dialect.dbapi.connect(
+                *cargs, async_creator_fn=fake_asyncpg_connect, **cparams
+            )
+        )
+        raise ConnectAbortedError
+
+    with pytest.raises(ConnectAbortedError):
+        async with database.engine.connect():
+            pass
+    await database.engine.dispose()
+
+    assert adapted[0]._prepared_statement_cache.capacity == 7
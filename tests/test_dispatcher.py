@@ -0,0 +1,98 @@
+import asyncio
+import logging
+
+from app.telegram.dispatcher import Dispatcher
+
+
+def message(chat_id, text):
+    return {"message": {"chat": {"id": chat_id}, "text": text}}
+
+
+def make_dispatcher(handler, **kwargs) -> Dispatcher:
+    options = {"mailbox_size": 10, "max_concurrency": 10}
+    options.update(kwargs)
+    return Dispatcher(
+        handler=handler, logger=logging.getLogger("test"), **options
+    )
+
+
+async def test_updates_of_a_chat_are_handled_in_order():
+    handled = []
+
+    async def handler(update):
+        # Later updates finish faster, order must still hold
+        await asyncio.sleep(0.01 / (len(handled) + 1))
+        handled.append(update["message"]["text"])
+
+    dispatcher = make_dispatcher(handler)
+    for text in ("a", "b", "c"):
+        await dispatcher.dispatch(message(1, text))
+    await asyncio.sleep(0.05)
+    await dispatcher.stop()
+
+    assert handled == ["a", "b", "c"]
+
+
+async def test_chats_are_handled_concurrently():
+    release = asyncio.Event()
+    handled = []
+
+    async def handler(update):
+        if update["message"]["chat"]["id"] == 1:
+            await release.wait()
+        handled.append(update["message"]["chat"]["id"])
+
+    dispatcher = make_dispatcher(handler)
+    await dispatcher.dispatch(message(1, "slow"))
+    await dispatcher.dispatch(message(2, "fast"))
+    await asyncio.sleep(0.01)
+    assert handled == [2]
+    release.set()
+    await asyncio.sleep(0.01)
+    await dispatcher.stop()
+
+    assert handled == [2, 1]
+
+
+async def test_full_mailbox_refuses_nowait_dispatch():
+    release = asyncio.Event()
+
+    async def handler(update):
+        await release.wait()
+
+    dispatcher = make_dispatcher(handler, mailbox_size=1)
+    assert dispatcher.dispatch_nowait(message(1, "in progress"))
+    await asyncio.sleep(0.01)
+    assert dispatcher.dispatch_nowait(message(1, "queued"))
+
+    assert not dispatcher.dispatch_nowait(message(1, "dropped"))
+    assert dispatcher.dispatch_nowait(message(2, "other chat"))
+    release.set()
+    await dispatcher.stop()
+
+
+async def test_failing_handler_is_counted_and_chat_keeps_going():
+    handled = []
+
+    async def handler(update):
+        await asyncio.sleep(0)
+        if update["message"]["text"] == "boom":
+            raise RuntimeError
+        handled.append(update["message"]["text"])
+
+    dispatcher = make_dispatcher(handler)
+    await dispatcher.dispatch(message(1, "boom"))
+    await dispatcher.dispatch(message(1, "after"))
+    await asyncio.sleep(0.01)
+    stats = dispatcher.stats()
+    await dispatcher.stop()
+
+    assert handled == ["after"]
+    assert stats["failed"] == 1
+    assert stats["processed"] == 1
+
+
+def test_poll_updates_share_a_key_per_poll():
+    key = Dispatcher.get_chat_key
+    assert key({"poll_answer": {"poll_id": "p"}}) == key({"poll": {"id": "p"}})
+    assert key(message(5, "x")) == 5
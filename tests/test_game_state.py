@@ -0,0 +1,76 @@
+import pytest
+
+from app.game.state import GameState, PlayerState, ShareState
+
+TELEGRAM_ID = 500
+
+
+@pytest.fixture
+def state():
+    state = GameState(
+        game_id=1,
+        chat_id=-100,
+        turn=1,
+        shares={10: ShareState(share_id=10, name="GAZP", price=300)},
+    )
+    state.add_player(
+        PlayerState(
+            id=7,
+            user_id=3,
+            telegram_id=TELEGRAM_ID,
+            first_name="Ann",
+            nickname="ann",
+            balance=1000,
+        )
+    )
+    return state
+
+
+def test_buy_charges_balance_and_records_trade(state):
+    assert state.buy(TELEGRAM_ID, 10)
+
+    player = state.players[7]
+    assert player.balance == 700
+    assert player.holdings == {10: 1}
+    assert state.pending_trades == {(7, 10): [1, -300]}
+
+
+def test_buy_is_refused_without_enough_balance(state):
+    state.players[7].balance = 299
+
+    assert not state.buy(TELEGRAM_ID, 10)
+    assert state.players[7].holdings == {}
+    assert not state.is_dirty
+
+
+def test_sell_is_refused_without_holdings(state):
+    assert not state.sell(TELEGRAM_ID, 10)
+    assert state.players[7].balance == 1000
+    assert not state.is_dirty
+
+
+def test_dead_player_cannot_trade(state):
+    state.players[7].alive = False
+
+    assert not state.buy(TELEGRAM_ID, 10)
+    assert not state.is_dirty
+
+
+def test_pending_trades_are_netted_per_share(state):
+    state.buy(TELEGRAM_ID, 10)
+    state.buy(TELEGRAM_ID, 10)
+    state.shares[10].price = 400
+    state.sell(TELEGRAM_ID, 10)
+
+    assert state.players[7].holdings == {10: 1}
+    assert state.players[7].balance == 800
+    assert state.pending_trades == {(7, 10): [1, -200]}
+
+
+def test_restored_changes_merge_with_newer_trades(state):
+    state.buy(TELEGRAM_ID, 10)
+    trades = state.take_changes()
+    state.buy(TELEGRAM_ID, 10)
+    state.restore_changes(trades)
+
+    assert state.pending_trades == {(7, 10): [2, -600]}
@@ -0,0 +1,48 @@
+import pytest
+
+from app.game.price_engine import PRICE_MODELS, new_price_seed
+
+START_PRICES = [100, 250, 500, 1000, 1]
+MINIMAL_PRICE = 1
+MAXIMUM_PRICE = 2000
+TURNS = 10
+
+
+def play(model, price_seed, other_games=0):
+    # Seeds a turn the way GameAccessor.reprice_shares does
+    prices = list(START_PRICES)
+    history = []
+    for turn in range(1, TURNS + 1):
+        rows = [prices] + [START_PRICES] * other_games
+        seeds = [f"{price_seed}:{turn}"] + [
+            f"other-{game}:{turn}" for game in range(other_games)
+        ]
+        prices = model.step(rows, seeds, MINIMAL_PRICE, MAXIMUM_PRICE)[0]
+        history.append(prices)
+    return history
+
+
+@pytest.fixture(params=list(PRICE_MODELS))
+def model(request):
+    return PRICE_MODELS[request.param]
+
+
+def test_same_seed_replays_the_same_sequence(model):
+    price_seed = new_price_seed()
+
+    assert play(model, price_seed) == play(model, price_seed)
+
+
+def test_sequence_does_not_depend_on_the_batch(model):
+    price_seed = new_price_seed()
+
+    assert play(model, price_seed) == play(model, price_seed, other_games=3)
+
+
+def test_different_seeds_give_different_sequences(model):
+    assert play(model, "seed-a") != play(model, "seed-b")
+
+
+def test_prices_stay_within_bounds(model):
+    for prices in play(model, new_price_seed()):
+        assert all(MINIMAL_PRICE <= price <= MAXIMUM_PRICE for price in prices)
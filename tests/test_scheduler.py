@@ -0,0 +1,104 @@
+import asyncio
+import logging
+
+import pytest
+
+from app.game.scheduler import COMPACT_THRESHOLD, TurnScheduler
+
+
+@pytest.fixture
+def fired():
+    return []
+
+
+@pytest.fixture
+async def scheduler(fired):
+    async def on_deadline(game_id):
+        await asyncio.sleep(0)
+        fired.append(game_id)
+
+    scheduler = TurnScheduler(
+        on_deadline=on_deadline, logger=logging.getLogger("test")
+    )
+    scheduler.start()
+    yield scheduler
+    await scheduler.stop()
+
+
+async def test_deadlines_fire_in_order(scheduler, fired):
+    scheduler.schedule(game_id=1, delay=0.06)
+    scheduler.schedule(game_id=2, delay=0.02)
+    scheduler.schedule(game_id=3, delay=0.04)
+    await asyncio.sleep(0.1)
+
+    assert fired == [2, 3, 1]
+    assert not scheduler.is_scheduled(1)
+
+
+async def test_cancelled_deadline_never_fires(scheduler, fired):
+    scheduler.schedule(game_id=1, delay=0.02)
+    scheduler.schedule(game_id=2, delay=0.03)
+    scheduler.cancel(1)
+    await asyncio.sleep(0.06)
+
+    assert fired == [2]
+
+
+async def test_skip_reschedule_fires_exactly_once(scheduler, fired):
+    scheduler.schedule(game_id=1, delay=10)
+    assert scheduler.reschedule(game_id=1, delay=0)
+    # A second vote for the same skip finds the turn already gone
+    await asyncio.sleep(0.02)
+    assert not scheduler.reschedule(game_id=1, delay=0)
+    await asyncio.sleep(0.02)
+
+    assert fired == [1]
+    assert scheduler.stats()["fired"] == 1
+
+
+async def test_reschedule_replaces_the_old_deadline(scheduler, fired):
+    scheduler.schedule(game_id=1, delay=0.02)
+    scheduler.reschedule(game_id=1, delay=0.05)
+    await asyncio.sleep(0.03)
+    assert fired == []
+    await asyncio.sleep(0.04)
+
+    assert fired == [1]
+
+
+async def test_reschedule_of_unknown_game_is_refused(scheduler):
+    assert not scheduler.reschedule(game_id=1, delay=0)
+    await asyncio.sleep(0.01)
+
+    assert not scheduler.is_scheduled(1)
+    assert scheduler.stats()["fired"] == 0
+
+
+async def test_cancelled_entries_are_compacted(scheduler, fired):
+    for game_id in range(COMPACT_THRESHOLD * 2):
+        scheduler.schedule(game_id=game_id, delay=10)
+        scheduler.cancel(game_id)
+    scheduler.schedule(game_id=-1, delay=0.01)
+    await asyncio.sleep(0.03)
+
+    assert scheduler.stats()["heap_size"] < COMPACT_THRESHOLD
+    assert fired == [-1]
+
+
+async def test_failing_transition_does_not_stop_the_timer(fired):
+    async def on_deadline(game_id):
+        await asyncio.sleep(0)
+        fired.append(game_id)
+        if game_id == 1:
+            raise RuntimeError
+
+    scheduler = TurnScheduler(
+        on_deadline=on_deadline, logger=logging.getLogger("test")
+    )
+    scheduler.start()
+    scheduler.schedule(game_id=1, delay=0)
+    scheduler.schedule(game_id=2, delay=0.02)
+    await asyncio.sleep(0.05)
+    await scheduler.stop()
+
+    assert fired == [1, 2]
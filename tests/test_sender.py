@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from app.telegram.sender import (
+    BUCKET_IDLE_TIMEOUT,
+    OutboundSender,
+    Priority,
+    RateLimitExceededError,
+)
+
+OK = {"ok": True}
+
+
+def make_sender(send_request, **kwargs) -> OutboundSender:
+    options = {
+        "global_rate": 1000,
+        "chat_rate": 1000,
+        "chat_burst": 1000,
+        "max_attempts": 3,
+    }
+    options.update(kwargs)
+    return OutboundSender(
+        send_request=send_request, logger=logging.getLogger("test"), **options
+    )
+
+
+async def test_higher_priority_is_sent_first():
+    sent = []
+
+    async def send_request(method, payload):
+        await asyncio.sleep(0)
+        sent.append(method)
+        return OK
+
+    sender = make_sender(send_request)
+    futures = [
+        sender.submit("info", {}, Priority.info),
+        sender.submit("board", {}, Priority.board),
+        sender.submit("callback", {}, Priority.callback),
+    ]
+    sender.start()
+    await asyncio.gather(*futures)
+    await sender.stop()
+
+    assert sent == ["callback", "board", "info"]
+
+
+async def test_429_blocks_only_the_chat_bucket():
+    responses = [
+        {"ok": False, "error_code": 429, "parameters": {"retry_after": 0.1}},
+        OK,
+        OK,
+    ]
+
+    async def send_request(method, payload):
+        await asyncio.sleep(0)
+        return responses.pop(0)
+
+    sender = make_sender(send_request)
+    sender.start()
+    blocked = sender.submit("sendMessage", {}, Priority.info, chat_id=1)
+    await asyncio.sleep(0.05)
+
+    assert sender._chat_buckets[1].blocked_until > time.monotonic()
+    assert sender._global_bucket.blocked_until == 0
+    await sender.submit("sendMessage", {}, Priority.info, chat_id=2)
+    assert await blocked == OK
+    assert sender.stats()["retried"] == 1
+    await sender.stop()
+
+
+async def test_429_on_last_attempt_fails_the_request():
+    async def send_request(method, payload):
+        await asyncio.sleep(0)
+        return {"ok": False, "error_code": 429, "description": "slow down"}
+
+    sender = make_sender(send_request, max_attempts=1)
+    sender.start()
+    with pytest.raises(RateLimitExceededError):
+        await sender.submit("sendMessage", {}, Priority.info, chat_id=1)
+    stats = sender.stats()
+    await sender.stop()
+
+    assert stats["failed"] == 1
+    assert stats["sent"] == 0
+
+
+async def test_chat_rate_limit_spaces_requests():
+    sent_at = []
+
+    async def send_request(method, payload):
+        await asyncio.sleep(0)
+        sent_at.append(time.monotonic())
+        return OK
+
+    sender = make_sender(send_request, chat_rate=10, chat_burst=1)
+    sender.start()
+    await asyncio.gather(
+        *(sender.submit("m", {}, Priority.info, chat_id=1) for _ in range(3))
+    )
+    await sender.stop()
+
+    assert sent_at[2] - sent_at[0] >= 0.15
+
+
+async def test_idle_chat_buckets_are_evicted():
+    async def send_request(method, payload):
+        await asyncio.sleep(0)
+        return OK
+
+    sender = make_sender(send_request)
+    sender.start()
+    await sender.submit("m", {}, Priority.info, chat_id=1)
+    await sender.stop()
+    assert 1 in sender._chat_buckets
+
+    sender._evict_idle_buckets(time.monotonic() + BUCKET_IDLE_TIMEOUT + 1)
+
+    assert sender._chat_buckets == {}
+
+
+async def test_stop_cancels_queued_requests():
+    async def send_request(method, payload):
+        await asyncio.sleep(0)
+        return OK
+
+    sender = make_sender(send_request)
+    future = sender.submit("m", {}, Priority.info)
+    await sender.stop()
+
+    assert future.cancelled()
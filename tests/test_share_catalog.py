@@ -0,0 +1,74 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from app.game.accessor import GameAccessor
+from app.game.models import ShareModel
+
+
+class FakeDatabase:
+    def __init__(self, shares) -> None:
+        self.shares = shares
+        self.loads = 0
+        self.release: asyncio.Event | None = None
+
+    @asynccontextmanager
+    async def session(self):
+        yield self
+
+    async def scalars(self, stmt):
+        self.loads += 1
+        snapshot = list(self.shares)
+        if self.release:
+            await self.release.wait()
+        return snapshot
+
+    def on_commit(self, callback):
+        callback()
+
+
+def make_share(share_id, name):
+    share = ShareModel(name=name, start_price=100)
+    share.id = share_id
+    return share
+
+
+@pytest.fixture
+def database():
+    return FakeDatabase([make_share(1, "GAZP"), make_share(2, "SBER")])
+
+
+@pytest.fixture
+def games(database):
+    app = SimpleNamespace(on_startup=[], on_cleanup=[], database=database)
+    return GameAccessor(app)
+
+
+async def test_catalog_is_indexed_by_id_and_name(games, database):
+    assert (await games.get_share_by_name("SBER")).id == 2
+    assert (await games.get_share_by_id(1)).name == "GAZP"
+    assert await games.get_share_by_name("YNDX") is None
+    assert database.loads == 1
+
+
+async def test_invalidation_drops_both_indexes(games, database):
+    await games.get_share_by_name("GAZP")
+    database.shares = [make_share(1, "GAZP2")]
+    games._invalidate_share_catalog()
+
+    assert await games.get_share_by_name("GAZP") is None
+    assert (await games.get_share_by_id(1)).name == "GAZP2"
+
+
+async def test_load_racing_an_invalidation_is_not_cached(games, database):
+    database.release = asyncio.Event()
+    stale = asyncio.create_task(games.get_share_by_name("GAZP"))
+    await asyncio.sleep(0)
+    database.shares = [make_share(1, "GAZP2")]
+    games._invalidate_share_catalog()
+    database.release.set()
+    await stale
+
+    assert await games.get_share_by_name("GAZP2") is not None
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from app.game.state import GameState, PlayerState, ShareState
+from app.game.state_accessor import GameStateAccessor
+
+TELEGRAM_ID = 500
+
+
+def make_state(balance=1000, holdings=None):
+    state = GameState(
+        game_id=1,
+        chat_id=-100,
+        turn=1,
+        shares={10: ShareState(share_id=10, name="GAZP", price=300)},
+    )
+    state.add_player(
+        PlayerState(
+            id=7,
+            user_id=3,
+            telegram_id=TELEGRAM_ID,
+            first_name="Ann",
+            nickname="ann",
+            balance=balance,
+            holdings=dict(holdings or {}),
+        )
+    )
+    return state
+
+
+class FakeGames:
+    def __init__(self) -> None:
+        self.applied: list[dict] = []
+        self.refuse = False
+        self.error: Exception | None = None
+        self.board: GameState | None = None
+        self.during_apply = None
+
+    async def apply_trades(self, trades):
+        await asyncio.sleep(0)
+        if self.during_apply:
+            self.during_apply()
+        if self.error:
+            raise self.error
+        self.applied.append(trades)
+        if self.refuse:
+            return set()
+        return {player_id for player_id, _ in trades}
+
+    async def get_game_board(self, game_id):
+        await asyncio.sleep(0)
+        return self.board
+
+
+@pytest.fixture
+def games():
+    return FakeGames()
+
+
+@pytest.fixture
+def accessor(games):
+    app = SimpleNamespace(
+        on_startup=[], on_cleanup=[], store=SimpleNamespace(games=games)
+    )
+    accessor = GameStateAccessor(app)
+    accessor.logger = logging.getLogger("test")
+    return accessor
+
+
+async def test_flush_writes_pending_trades(accessor, games):
+    state = make_state()
+    accessor.add(state)
+    state.buy(TELEGRAM_ID, 10)
+
+    await accessor.flush()
+
+    assert games.applied == [{(7, 10): [1, -300]}]
+    assert not state.is_dirty
+
+
+async def test_failed_flush_restores_pending_trades(accessor, games):
+    state = make_state()
+    accessor.add(state)
+    state.buy(TELEGRAM_ID, 10)
+    games.error = ConnectionError("db down")
+    # A trade made while the write is in flight must survive too
+    games.during_apply = lambda: state.buy(TELEGRAM_ID, 10)
+
+    with pytest.raises(ConnectionError):
+        await accessor.flush()
+
+    assert state.pending_trades == {(7, 10): [2, -600]}
+
+
+async def test_refused_flush_reloads_and_replays_newer_trades(accessor, games):
+    state = make_state()
+    accessor.add(state)
+    state.buy(TELEGRAM_ID, 10)
+    games.refuse = True
+    games.board = make_state(balance=500, holdings={10: 2})
+    games.during_apply = lambda: state.buy(TELEGRAM_ID, 10)
+
+    await accessor.flush()
+
+    # The refused buy is dropped, the one made during the flush is replayed
+    player = state.players[7]
+    assert player.balance == 200
+    assert player.holdings == {10: 3}
+    assert state.pending_trades == {(7, 10): [1, -300]}
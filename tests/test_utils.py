@@ -0,0 +1,55 @@
+import datetime
+from types import SimpleNamespace
+
+from app.admin.schemes import GameResultSchema, GameSchema, UserSchema
+from app.web.utils import compile_dump, dumps
+
+STARTED_AT = datetime.datetime(2024, 5, 1, 12, 30)
+
+
+def test_compiled_dump_matches_schema_for_objects():
+    games = [
+        SimpleNamespace(
+            id=1,
+            chat_id=-100,
+            started_at=STARTED_AT,
+            finish_at=None,
+            is_active=False,
+        ),
+        # Attributes the object lacks are left out, as marshmallow does
+        SimpleNamespace(id=2, chat_id=-100, started_at=STARTED_AT),
+    ]
+    schema = GameSchema()
+
+    assert compile_dump(schema)(games) == schema.dump(games, many=True)
+
+
+def test_compiled_dump_matches_schema_for_mappings():
+    users = [
+        {
+            "id": 1,
+            "telegram_id": 10,
+            "nickname": "nick",
+            "is_admin": True,
+            "password": None,
+        }
+    ]
+    schema = UserSchema()
+
+    assert compile_dump(schema)(users) == schema.dump(users, many=True)
+
+
+def test_compiled_dump_handles_mixed_input():
+    rows = [
+        SimpleNamespace(game_id=1, rank=1, finished_at=STARTED_AT),
+        {"game_id": 2, "rank": 2, "finished_at": STARTED_AT},
+    ]
+    schema = GameResultSchema()
+
+    assert compile_dump(schema)(rows) == schema.dump(rows, many=True)
+
+
+def test_dumps_writes_compact_utf8_with_iso_dates():
+    assert dumps({"name": "Игрок", "at": STARTED_AT}) == (
+        '{"name":"Игрок","at":"2024-05-01T12:30:00"}'.encode()
+    )